@@ -2,19 +2,45 @@ import os
 import re
 import pandas as pd
 
-def _extract_phase_parts(phase_value: str):
-    """Extrae numero de fase y etapa (PRE/POST) desde valores como 'FASE 2 PRE'.
-    Devuelve (fase_numero:int, etapa:str) o (None, None) si no coincide.
+# Esquema de *_promedios.csv: las columnas de puntajes se leen directamente como float
+SUBSCALE_COLUMNS = [
+    "Auto-amabilidad",
+    "Humanidad_comun",
+    "Mindfulness",
+    "Auto-juicio",
+    "Aislamiento",
+    "Sobre-identificacion",
+    "Puntaje_global",
+]
+PROMEDIOS_DTYPES = {"Participante": "string", "Fase": "string", **{c: "float64" for c in SUBSCALE_COLUMNS}}
+
+# Orden de las etapas dentro de cada fase en las tablas de salida
+ETAPA_ORDEN = {"PRE": 0, "POST": 1}
+
+# Numero de fase y etapa dentro de valores como 'FASE 2 PRE' (sin distinguir mayusculas)
+FASE_PATTERN = r"FASE\s*(\d+)\s*(PRE|POST)"
+
+def decodificar_fase(fases: pd.Series) -> pd.DataFrame:
+    """Decodifica de una vez una columna de fases como 'FASE 2 PRE'.
+    Retorna un DataFrame con el mismo indice y las columnas Fase_Numero (Int64) y
+    Etapa (categorica PRE/POST); ambas quedan vacias (<NA>/NaN) si el valor no coincide.
     """
-    if pd.isna(phase_value):
-        return None, None
-    text = str(phase_value).strip()
-    match = re.search(r"FASE\s*(\d+)\s*(PRE|POST)", text, flags=re.IGNORECASE)
-    if not match:
-        return None, None
-    fase_num = int(match.group(1))
-    etapa = match.group(2).upper()
-    return fase_num, etapa
+    # Hay pocas fases distintas: se decodifica cada valor unico una vez y se expande con los codigos
+    codigos, unicos = pd.factorize(fases.astype("string"))
+    partes = pd.Series(unicos, dtype="string").str.extract(FASE_PATTERN, flags=re.IGNORECASE, expand=True)
+    numeros = pd.to_numeric(partes[0]).astype("Int64")
+    etapas = pd.Categorical(partes[1].str.upper(), categories=list(ETAPA_ORDEN), ordered=True)
+
+    # allow_fill: el codigo -1 (valor faltante) queda como <NA>
+    return pd.DataFrame({
+        "Fase_Numero": numeros.array.take(codigos, allow_fill=True),
+        "Etapa": etapas.take(codigos, allow_fill=True),
+    }, index=fases.index)
+
+
+def formatear_etiquetas_fase(fase_numero: pd.Series, etapa: pd.Series) -> pd.Series:
+    """Etiquetas "X - PRE/POST" armadas columna a columna."""
+    return fase_numero.astype("Int64").astype("string") + " - " + etapa.astype("string").str.upper()
 
 
 def _identify_subscale_columns(df: pd.DataFrame):
@@ -26,8 +52,12 @@ def _identify_subscale_columns(df: pd.DataFrame):
 
     numeric_cols = []
     for col in candidate_cols:
-        # Intentar convertir a numerico para verificar
-        coerced = pd.to_numeric(df[col], errors="coerce")
+        if pd.api.types.is_numeric_dtype(df[col]):
+            # Columnas ya numericas (por ejemplo las declaradas en PROMEDIOS_DTYPES): sin conversion
+            coerced = df[col]
+        else:
+            # Intentar convertir a numerico para verificar
+            coerced = pd.to_numeric(df[col], errors="coerce")
         if coerced.notna().any():
             numeric_cols.append(col)
     return numeric_cols
@@ -35,7 +65,8 @@ def _identify_subscale_columns(df: pd.DataFrame):
 
 def _coerce_numeric_inplace(df: pd.DataFrame, columns: list[str]):
     for c in columns:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+        if not pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
 
 
 def _read_results_files(resultados_dir: str, base_name: str):
@@ -43,7 +74,8 @@ def _read_results_files(resultados_dir: str, base_name: str):
     path = os.path.join(resultados_dir, f"{base_name}_promedios.csv")
     if not os.path.exists(path):
         raise FileNotFoundError(f"No existe el archivo de promedios: {path}")
-    return pd.read_csv(path)
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, dtype={c: t for c, t in PROMEDIOS_DTYPES.items() if c in header})
 
 
 def _prepare_dataframe(df_unified: pd.DataFrame):
@@ -51,52 +83,90 @@ def _prepare_dataframe(df_unified: pd.DataFrame):
     df = df_unified.copy()
 
     # Agregar fase descompuesta
-    phases = df["Fase"].apply(_extract_phase_parts)
-    df["Fase_Numero"] = phases.apply(lambda x: x[0])
-    df["Etapa"] = phases.apply(lambda x: x[1])
+    phases = decodificar_fase(df["Fase"])
+    df["Fase_Numero"] = phases["Fase_Numero"]
+    df["Etapa"] = phases["Etapa"]
 
     # Filtrar filas con fase parseada correctamente
-    df = df[pd.notna(df["Fase_Numero"]) & pd.notna(df["Etapa"])].copy()
-    df["Fase_Numero"] = df["Fase_Numero"].astype(int)
-    df["Etapa"] = df["Etapa"].astype(str)
-    return df
+    return df[df["Fase_Numero"].notna() & df["Etapa"].notna()].copy()
 
 
 def _format_phase_label(fase_num, etapa: str):
     return f"{int(fase_num)} - {etapa.upper()}"
 
 
-def calcular_estadisticas_por_fase(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Calcula media y desviacion estandar por subescala y fase (PRE/POST).
-    Retorna dos DataFrames en formato ancho: (medias, desviaciones).
+def _ordenar_fases(tabla: pd.DataFrame) -> pd.DataFrame:
+    """Ordena una tabla indexada por (Fase_Numero, Etapa): fase ascendente y PRE antes que POST."""
+    return tabla.sort_index(key=lambda nivel: nivel.map(ETAPA_ORDEN) if nivel.name == "Etapa" else nivel)
+
+
+def agregar_por_fase(df: pd.DataFrame, subscale_cols: list[str] | None = None) -> pd.DataFrame:
+    """Una sola pasada de agregacion por (Fase_Numero, Etapa) para todas las columnas de puntajes.
+    Retorna un DataFrame indexado por (Fase_Numero, Etapa), ordenado por fase y etapa, con columnas
+    de dos niveles (estadistica, columna) para las estadisticas "media", "de" (ddof=1) y "n".
+    Las medias no estan redondeadas, para poder calcular las diferencias POST - PRE.
+    """
+    if subscale_cols is None:
+        subscale_cols = _identify_subscale_columns(df)
+    valores = df[subscale_cols]
+    if not all(pd.api.types.is_numeric_dtype(valores[c]) for c in subscale_cols):
+        valores = valores.apply(pd.to_numeric, errors="coerce")
+
+    # observed=True: solo las combinaciones fase/etapa presentes (Etapa es categorica)
+    agregado = valores.groupby([df["Fase_Numero"], df["Etapa"]], observed=True).agg(["mean", "std", "count"])
+    # Indice simple (int/str): al pivotar por etapa no aparecen etapas sin datos
+    agregado.index = pd.MultiIndex.from_arrays(
+        [agregado.index.get_level_values(0).astype(int), agregado.index.get_level_values(1).astype(str)],
+        names=["Fase_Numero", "Etapa"])
+    agregado = agregado.rename(columns={"mean": "media", "std": "de", "count": "n"}, level=1)
+    agregado = agregado.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+    return _ordenar_fases(agregado)
+
+
+def _tabla_ancha(tabla: pd.DataFrame, medida: str, subscale_cols: list[str]) -> pd.DataFrame:
+    """Convierte una tabla indexada por (Fase_Numero, Etapa) al formato de salida: Medida, Fase, columnas."""
+    tabla = tabla.round(2).reset_index()
+    tabla["Fase"] = formatear_etiquetas_fase(tabla["Fase_Numero"], tabla["Etapa"])
+    tabla = tabla[["Fase", *subscale_cols]].copy()
+    tabla.insert(0, "Medida", medida)
+    return tabla
+
+
+def tablas_desde_estadisticas(medias: pd.DataFrame, desvios: pd.DataFrame, subscale_cols: list[str]):
+    """Tablas de medias, desviaciones y diferencias POST - PRE (ya ordenadas) a partir de
+    medias sin redondear y desviaciones indexadas por (Fase_Numero, Etapa).
     """
-    subscale_cols = _identify_subscale_columns(df)
-    _coerce_numeric_inplace(df, subscale_cols)
+    medias = _ordenar_fases(medias[subscale_cols])
+    desvios = _ordenar_fases(desvios[subscale_cols])
+    return (_tabla_ancha(medias, "Media", subscale_cols),
+            _tabla_ancha(desvios, "DE", subscale_cols),
+            _diferencias_desde_medias(medias, subscale_cols))
 
-    agrupado = df.groupby(["Fase_Numero", "Etapa"], dropna=False)[subscale_cols]
-    mean_df = agrupado.mean().round(2).reset_index()
-    std_df = agrupado.std(ddof=1).round(2).reset_index()
 
-    # Etiqueta de fase "X - PRE/POST"
-    mean_df["Fase"] = mean_df.apply(lambda r: _format_phase_label(r["Fase_Numero"], r["Etapa"]), axis=1)
-    std_df["Fase"] = std_df.apply(lambda r: _format_phase_label(r["Fase_Numero"], r["Etapa"]), axis=1)
+def tablas_desde_agregado(agregado: pd.DataFrame):
+    """Tablas de salida (medias, desviaciones, diferencias) a partir del resultado de agregar_por_fase."""
+    subscale_cols = list(agregado["media"].columns)
+    return tablas_desde_estadisticas(agregado["media"], agregado["de"], subscale_cols)
 
-    medias = mean_df[["Fase", *subscale_cols]].copy()
-    desvios = std_df[["Fase", *subscale_cols]].copy()
-    medias.insert(0, "Medida", "Media")
-    desvios.insert(0, "Medida", "DE")
-    return medias, desvios
+
+def calcular_estadisticas_por_fase(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Calcula media y desviacion estandar por subescala y fase (PRE/POST).
+    Retorna dos DataFrames en formato ancho: (medias, desviaciones).
+    """
+    df_media, df_de, _ = tablas_desde_agregado(agregar_por_fase(df))
+    return df_media, df_de
 
 
 def calcular_diferencias_post_pre(df: pd.DataFrame) -> pd.DataFrame:
     """Calcula diferencias de medias POST - PRE por subescala dentro de la misma fase.
     Retorna formato ancho con columnas de subescalas y fila por fase.
     """
-    subscale_cols = _identify_subscale_columns(df)
-    _coerce_numeric_inplace(df, subscale_cols)
+    _, _, df_diff = tablas_desde_agregado(agregar_por_fase(df))
+    return df_diff
+
 
-    # Promedios por fase y etapa en una tabla pivote
-    mean_df = df.groupby(["Fase_Numero", "Etapa"], dropna=False)[subscale_cols].mean()
+def _diferencias_desde_medias(mean_df: pd.DataFrame, subscale_cols: list[str]) -> pd.DataFrame:
+    """Diferencias POST - PRE a partir de las medias sin redondear indexadas por (Fase_Numero, Etapa)."""
     pivot = mean_df.unstack("Etapa")  # columnas multinivel: (subescala, PRE/POST)
 
     filas = []
@@ -113,23 +183,63 @@ def calcular_diferencias_post_pre(df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(filas)
 
 
+def acumular_por_fase(df: pd.DataFrame, subscale_cols: list[str], pesos=None) -> pd.DataFrame:
+    """Acumulados por (Fase_Numero, Etapa, Columna): cantidad de valores, suma y suma de cuadrados.
+    Los acumulados de dos conjuntos de filas se combinan sumandolos (combinar_acumulados),
+    y pesos negativos (-1) sirven para descontar filas que ya no estan.
+    """
+    valores = df[subscale_cols].apply(pd.to_numeric, errors="coerce")
+    pesos = pd.Series(1.0 if pesos is None else pesos, index=df.index)
+    presentes = valores.notna().astype(float).mul(pesos, axis=0)
+    valores = valores.fillna(0.0)
+    # Claves simples (int/str) para que coincidan con los acumulados guardados en JSON
+    claves = [df["Fase_Numero"].astype(int), df["Etapa"].astype(str)]
+
+    partes = {
+        "n": presentes.groupby(claves).sum(),
+        "suma": valores.mul(pesos, axis=0).groupby(claves).sum(),
+        "suma_cuadrados": (valores * valores).mul(pesos, axis=0).groupby(claves).sum(),
+    }
+    acumulados = pd.concat({nombre: parte.stack() for nombre, parte in partes.items()}, axis=1)
+    acumulados.index = acumulados.index.set_names(["Fase_Numero", "Etapa", "Columna"])
+    return acumulados
+
+
+def combinar_acumulados(*acumulados: pd.DataFrame) -> pd.DataFrame:
+    """Suma acumulados de distintos conjuntos de filas (mismo resultado que acumular todas juntas)."""
+    partes = [a for a in acumulados if a is not None and not a.empty]
+    if not partes:
+        return pd.DataFrame(columns=["n", "suma", "suma_cuadrados"])
+    combinado = partes[0]
+    for parte in partes[1:]:
+        combinado = combinado.add(parte, fill_value=0.0)
+    return combinado.sort_index()
+
+
+def estadisticas_desde_acumulados(acumulados: pd.DataFrame, subscale_cols: list[str]):
+    """Medias, desviaciones (ddof=1) y diferencias POST - PRE a partir de los acumulados,
+    en el mismo formato que calcular_estadisticas_por_fase y calcular_diferencias_post_pre.
+    """
+    n = acumulados["n"].round().unstack("Columna").reindex(columns=subscale_cols)
+    suma = acumulados["suma"].unstack("Columna").reindex(columns=subscale_cols)
+    suma_cuadrados = acumulados["suma_cuadrados"].unstack("Columna").reindex(columns=subscale_cols)
+
+    # Grupos que se quedaron sin filas
+    con_datos = n.fillna(0).sum(axis=1) > 0
+    n, suma, suma_cuadrados = n[con_datos], suma[con_datos], suma_cuadrados[con_datos]
+
+    medias = suma / n.where(n > 0)
+    varianza = (suma_cuadrados - suma * suma / n.where(n > 0)) / (n - 1).where(n > 1)
+    desvios = varianza.clip(lower=0) ** 0.5
+
+    return tablas_desde_estadisticas(medias, desvios, subscale_cols)
+
+
 def guardar_resultados(resultados_dir: str, base_name: str, df_media: pd.DataFrame, df_de: pd.DataFrame, df_diff: pd.DataFrame):
     os.makedirs(resultados_dir, exist_ok=True)
+    # Las tablas ya vienen ordenadas por fase y etapa (PRE antes que POST): Media, DE y Diferencia
     combinado = pd.concat([df_media, df_de, df_diff], ignore_index=True)
 
-    # Ordenar: primero PRE y luego POST por fase dentro de cada Medida
-    # Extraer numero de fase y etapa desde columna Fase (ej: "2 - PRE")
-    fase_num = combinado["Fase"].str.extract(r"^(\d+)\s*-\s*(PRE|POST)$", expand=True)
-    combinado["_fase_num"] = pd.to_numeric(fase_num[0], errors="coerce").fillna(-1).astype(int)
-    combinado["_etapa"] = fase_num[1].fillna("")
-    etapa_order = {"PRE": 0, "POST": 1}
-    combinado["_etapa_ord"] = combinado["_etapa"].map(etapa_order).fillna(9).astype(int)
-    medida_order = {"Media": 0, "DE": 1, "Diferencia": 2}
-    combinado["_medida_ord"] = combinado["Medida"].map(medida_order).fillna(9).astype(int)
-
-    combinado = combinado.sort_values(by=["_medida_ord", "_fase_num", "_etapa_ord", "Fase"]).reset_index(drop=True)
-    combinado = combinado.drop(columns=["_fase_num", "_etapa", "_etapa_ord", "_medida_ord"])
-
     out_path = os.path.join(resultados_dir, f"{base_name}_analisis.csv")
     combinado.to_csv(out_path, index=False, encoding="utf-8")
     print(f"Guardado: {out_path}")
@@ -146,11 +256,13 @@ def _listar_bases_disponibles(resultados_dir: str):
 
 
 def procesar_base(resultados_dir: str, base_name: str):
+    """Genera <base>_analisis.csv y devuelve el agregado por fase (ver agregar_por_fase)."""
     df_unified = _read_results_files(resultados_dir, base_name)
     df = _prepare_dataframe(df_unified)
-    df_media, df_de = calcular_estadisticas_por_fase(df)
-    df_diff = calcular_diferencias_post_pre(df)
+    agregado = agregar_por_fase(df)
+    df_media, df_de, df_diff = tablas_desde_agregado(agregado)
     guardar_resultados(resultados_dir, base_name, df_media, df_de, df_diff)
+    return agregado
 
 
 def main():
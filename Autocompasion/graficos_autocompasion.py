@@ -1,10 +1,12 @@
 import os
-import re
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import sys
 from procesar_subescalas import process_experience_data, select_csv_file
-from analisis_subescalas import calcular_estadisticas_por_fase, _prepare_dataframe
+from analisis_subescalas import agregar_por_fase, _prepare_dataframe, ETAPA_ORDEN
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from cache_graficos import load_manifest, save_manifest, render_if_changed
 
 # Etiquetas de subescalas (deben coincidir con las del script procesar_subescalas.py)
 SUBSCALES = [
@@ -30,6 +32,20 @@ def ensure_output_dir(filename=None):
     else:
         return base_output_dir
 
+ETAPAS = list(ETAPA_ORDEN)
+
+def participant_stage_matrix(df_filtered, column):
+    """
+    Matriz participante x etapa (PRE, POST) con la media de column, en un solo groupby.
+    Los participantes quedan ordenados; una etapa sin registros del participante vale 0.
+    """
+    grouped = df_filtered.groupby(['Participante', 'Etapa'], observed=True)[column]
+    means = grouped.mean().unstack('Etapa')
+    present = grouped.size().unstack('Etapa')
+    matrix = means.where(present.notna(), 0).reindex(columns=ETAPAS, fill_value=0)
+    matrix.columns = list(matrix.columns)
+    return matrix
+
 def plot_individual_overall_scores(df, output_dir):
     """
     Gráfico de puntajes globales individuales:
@@ -37,37 +53,20 @@ def plot_individual_overall_scores(df, output_dir):
     y-axis: overall EAC score
     one bar for pre and one for post
     """
-    # Filtrar solo datos PRE y POST
-    df_filtered = df[df['Fase'].str.contains('PRE|POST', flags=re.IGNORECASE, na=False)].copy()
-    
-    # Extraer información de fase y etapa
-    df_filtered['Fase_Numero'] = df_filtered['Fase'].str.extract(r'FASE (\d+)').astype(int)
-    df_filtered['Etapa'] = df_filtered['Fase'].str.extract(r'(PRE|POST)', flags=re.IGNORECASE)
+    # Filtrar solo datos PRE y POST, con la fase y la etapa decodificadas
+    df_filtered = _prepare_dataframe(df)
     
     # Crear figura
     fig, ax = plt.subplots(figsize=(12, 8))
     
-    # Obtener participantes únicos
-    participants = sorted(df_filtered['Participante'].unique())
+    # Matriz participante x etapa con el puntaje global medio (0 si no tiene esa etapa)
+    scores = participant_stage_matrix(df_filtered, 'Puntaje_global')
+    participants = list(scores.index)
+    pre_scores = scores['PRE'].to_numpy()
+    post_scores = scores['POST'].to_numpy()
     x = np.arange(len(participants))
     width = 0.35
     
-    # Preparar datos para PRE y POST
-    pre_scores = []
-    post_scores = []
-    
-    for participant in participants:
-        pre_data = df_filtered[(df_filtered['Participante'] == participant) & 
-                              (df_filtered['Etapa'] == 'PRE')]
-        post_data = df_filtered[(df_filtered['Participante'] == participant) & 
-                               (df_filtered['Etapa'] == 'POST')]
-        
-        pre_score = pre_data['Puntaje_global'].mean() if not pre_data.empty else 0
-        post_score = post_data['Puntaje_global'].mean() if not post_data.empty else 0
-        
-        pre_scores.append(pre_score)
-        post_scores.append(post_score)
-    
     # Crear barras
     bars1 = ax.bar(x - width/2, pre_scores, width, label='PRE', alpha=0.8, color='skyblue')
     bars2 = ax.bar(x + width/2, post_scores, width, label='POST', alpha=0.8, color='lightcoral')
@@ -97,19 +96,20 @@ def plot_individual_overall_scores(df, output_dir):
     plt.close(fig)
     print(f'Gráfico guardado: {filepath}')
 
-def plot_group_averages_subscales(df, output_dir):
+def plot_group_averages_subscales(agregado, output_dir):
     """
     Gráfico de promedios grupales de subescalas:
     x-axis: subescalas
     y-axis: group average
     one bar for pre and one for post
+    agregado: resultado de analisis_subescalas.agregar_por_fase (no se vuelve a calcular)
     """
-    # Preparar datos usando la función de análisis_subescalas
-    df_prepared = _prepare_dataframe(df)
-    medias, desvios = calcular_estadisticas_por_fase(df_prepared)
-    
-    # Filtrar solo medias (no desviaciones)
-    medias_only = medias[medias['Medida'] == 'Media'].copy()
+    # Matriz subescala x etapa: promedio de las medias por fase, redondeadas igual que en la
+    # tabla de análisis (0 si no hay datos de esa etapa)
+    medias = agregado['media'].round(2)[SUBSCALES]
+    means = medias.groupby(level='Etapa').mean().T.reindex(columns=ETAPAS, fill_value=0)
+    pre_means = means['PRE'].to_numpy()
+    post_means = means['POST'].to_numpy()
     
     # Crear figura
     fig, ax = plt.subplots(figsize=(14, 8))
@@ -117,20 +117,6 @@ def plot_group_averages_subscales(df, output_dir):
     x = np.arange(len(SUBSCALES))
     width = 0.35
     
-    # Preparar datos para PRE y POST
-    pre_means = []
-    post_means = []
-    
-    for subscale in SUBSCALES:
-        pre_data = medias_only[medias_only['Fase'].str.contains('PRE', flags=re.IGNORECASE)]
-        post_data = medias_only[medias_only['Fase'].str.contains('POST', flags=re.IGNORECASE)]
-        
-        pre_mean = pre_data[subscale].mean() if not pre_data.empty else 0
-        post_mean = post_data[subscale].mean() if not post_data.empty else 0
-        
-        pre_means.append(pre_mean)
-        post_means.append(post_mean)
-    
     # Crear barras
     bars1 = ax.bar(x - width/2, pre_means, width, label='PRE', alpha=0.8, color='skyblue')
     bars2 = ax.bar(x + width/2, post_means, width, label='POST', alpha=0.8, color='lightcoral')
@@ -165,11 +151,8 @@ def plot_boxplot_overall_scores(df, output_dir):
     Boxplot de puntajes globales:
     two boxes (one for PRE and one for POST)
     """
-    # Filtrar solo datos PRE y POST
-    df_filtered = df[df['Fase'].str.contains('PRE|POST', flags=re.IGNORECASE, na=False)].copy()
-    
-    # Extraer información de etapa y fase
-    df_filtered['Etapa'] = df_filtered['Fase'].str.extract(r'(PRE|POST)', flags=re.IGNORECASE)
+    # Filtrar solo datos PRE y POST, con la fase y la etapa decodificadas
+    df_filtered = _prepare_dataframe(df)
     
     # Extraer el número de fase
     #######fase_numbers = df_filtered['Fase'].str.extract(r'(\d+)').dropna()
@@ -211,6 +194,10 @@ def plot_boxplot_overall_scores(df, output_dir):
     plt.close(fig)
     print(f'Gráfico guardado: {filepath}')
 
+def person_chart_filename(participant):
+    safe_person_name = participant.replace(' ', '_')
+    return f'{safe_person_name}_autocompasion.png'
+
 def plot_autocompasion_person(participant, phases_data, global_data, output_dir):
     """
     Generar grafico comparativo de subescalas para un participante en distintas fases,
@@ -248,32 +235,46 @@ def plot_autocompasion_person(participant, phases_data, global_data, output_dir)
     plt.tight_layout()
     
     # Guardar figura
-    safe_person_name = participant.replace(' ', '_')
-    filename = f'{safe_person_name}_autocompasion.png'
+    filename = person_chart_filename(participant)
     filepath = os.path.join(output_dir, filename)
     plt.savefig(filepath, bbox_inches='tight', dpi=300)
     plt.close(fig)
     print(f'Gráfico guardado: {filepath}')
 
-def generate_all_graphs(csv_file):
-    """Generar todos los gráficos de autocompasión"""
-    # Procesar datos
-    subscale_results, global_results = process_experience_data(csv_file)
-    
-    # Convertir a DataFrame para facilitar el procesamiento
-    df = pd.DataFrame(subscale_results)
+def generate_all_graphs(csv_file, force=False, agregado=None, df=None):
+    """
+    Generar todos los gráficos de autocompasión.
+    Los gráficos cuyos datos no cambiaron desde la última ejecución no se vuelven a dibujar (salvo force).
+    agregado: resultado de agregar_por_fase ya calculado por el análisis (si no, se calcula aquí).
+    df: resultados ya puntuados de csv_file (score_dataframe); si no se pasan, se puntúa el archivo.
+    """
+    if df is None:
+        # Procesar datos
+        subscale_results, global_results = process_experience_data(csv_file)
+        
+        # Convertir a DataFrame para facilitar el procesamiento
+        df = pd.DataFrame(subscale_results)
+    else:
+        subscale_results, global_results = df.to_dict('records'), []
+    if agregado is None:
+        agregado = agregar_por_fase(_prepare_dataframe(df))
     
     # Crear directorio de salida con el nombre del archivo
     output_dir = ensure_output_dir(csv_file)
+    manifest = load_manifest(output_dir)
+    rendered = 0
     
     # 1. Gráfico de puntajes globales individuales
-    plot_individual_overall_scores(df, output_dir)
+    rendered += render_if_changed(manifest, output_dir, 'puntajes_globales_individuales.png',
+                                  plot_individual_overall_scores, df, output_dir, force=force)
     
     # 2. Gráfico de promedios grupales de subescalas
-    plot_group_averages_subscales(df, output_dir)
+    rendered += render_if_changed(manifest, output_dir, 'promedios_grupales_subescalas.png',
+                                  plot_group_averages_subscales, agregado, output_dir, force=force)
     
     # 3. Boxplot de puntajes globales
-    plot_boxplot_overall_scores(df, output_dir)
+    rendered += render_if_changed(manifest, output_dir, 'boxplot_puntajes_globales.png',
+                                  plot_boxplot_overall_scores, df, output_dir, force=force)
     
     # 4. Gráficos individuales por participante (existente)
     # Reorganizar resultados por persona y fase
@@ -292,7 +293,13 @@ def generate_all_graphs(csv_file):
     
     for participant, phases_data in participants.items():
         global_data = globals_participants.get(participant, {})
-        plot_autocompasion_person(participant, phases_data, global_data, output_dir)
+        rendered += render_if_changed(manifest, output_dir, person_chart_filename(participant),
+                                      plot_autocompasion_person, participant, phases_data, global_data,
+                                      output_dir, force=force)
+    
+    save_manifest(output_dir, manifest)
+    total = 3 + len(participants)
+    print(f'Gráficos: {rendered} generados, {total - rendered} sin cambios')
 
 def main():
     """Funcion principal para generar graficos"""
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import base64
+import time
+import numpy as np
+import pandas as pd
+from procesar_subescalas import (SUBCALES, NUM_QUESTIONS, check_survey_schema, score_dataframe,
+                                 results_file_path, select_csv_file)
+from analisis_subescalas import (_prepare_dataframe, acumular_por_fase, combinar_acumulados,
+                                 estadisticas_desde_acumulados, guardar_resultados)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from anonimizador import save_mapping
+
+# Cambiar si cambia el formato del estado o la forma de puntuar
+STATE_VERSION = 2
+
+SCORE_COLUMNS = list(SUBCALES) + ['Puntaje_global']
+
+def state_file_path(subscale_file):
+    """<base>_estado.json junto a <base>_promedios.csv"""
+    return subscale_file.replace('_promedios.csv', '_estado.json')
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def row_hashes(df):
+    """
+    Hash de 64 bits del contenido de cada fila del CSV de entrada.
+    Los tipos se normalizan antes (respuestas a float64, el resto a texto): asi una respuesta vacia
+    nueva, que convierte su columna de int a float, no cambia el hash de las demas filas.
+    """
+    check_survey_schema(df)
+    end = 2 + NUM_QUESTIONS
+    normalized = pd.concat([
+        df.iloc[:, :2].astype(str),
+        df.iloc[:, 2:end].astype("float64"),
+        df.iloc[:, end:].astype(str),
+    ], axis=1)
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+def load_state(subscale_file):
+    """
+    Estado de la ultima ejecucion: hashes de las filas de entrada (en el orden de _promedios.csv)
+    y acumulados por fase. None si no existe o ya no corresponde a _promedios.csv.
+    """
+    path = state_file_path(subscale_file)
+    if not os.path.exists(path) or not os.path.exists(subscale_file):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(state, dict) or state.get("version") != STATE_VERSION
+            or state.get("promedios") != _file_signature(subscale_file)):
+        return None
+    acumulados = pd.DataFrame(state["acumulados"])
+    if not acumulados.empty:
+        acumulados = acumulados.set_index(["Fase_Numero", "Etapa", "Columna"])
+    return {
+        "hashes": np.frombuffer(base64.b64decode(state["hashes"]), dtype="<u8").astype(np.uint64),
+        "acumulados": acumulados,
+    }
+
+def save_state(subscale_file, hashes, acumulados):
+    """Guarda el estado de forma atomica, firmado con el _promedios.csv recien escrito"""
+    path = state_file_path(subscale_file)
+    state = {
+        "version": STATE_VERSION,
+        "promedios": _file_signature(subscale_file),
+        # Hashes como bytes en base64: mucho mas rapido de leer y escribir que una lista de enteros
+        "hashes": base64.b64encode(np.asarray(hashes, dtype="<u8").tobytes()).decode("ascii"),
+        "acumulados": acumulados.reset_index().to_dict("records"),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def _accumulate(scored, pesos=None):
+    """Acumulados por fase de filas ya puntuadas (las de fase no reconocida no cuentan)"""
+    df = scored if pesos is None else scored.assign(_peso=pesos)
+    df = _prepare_dataframe(df)
+    return acumular_por_fase(df, SCORE_COLUMNS, None if pesos is None else df["_peso"].to_numpy())
+
+def update_results_incremental(csv_file_path, data_dir, input_filename):
+    """
+    Actualiza <base>_promedios.csv y <base>_analisis.csv puntuando solo las filas nuevas o modificadas.
+    Las filas cuyo hash ya estaba en la ejecucion anterior reutilizan su resultado; las estadisticas
+    por fase se actualizan sumando las filas agregadas y descontando las eliminadas de los acumulados.
+    Sin estado valido (primera vez, o _promedios.csv modificado por otro medio) se procesa todo.
+    Devuelve (filas totales, filas puntuadas, filas eliminadas).
+    """
+    df = pd.read_csv(csv_file_path)
+    hashes = row_hashes(df)
+    subscale_file = results_file_path(data_dir, input_filename)
+    state = load_state(subscale_file)
+
+    if state is None:
+        scored = score_dataframe(df)
+        acumulados = combinar_acumulados(_accumulate(scored))
+        rescored, removed = len(df), 0
+    else:
+        old_hashes = state["hashes"]
+        old_position = pd.Series(np.arange(len(old_hashes)), index=old_hashes)
+        old_position = old_position[~old_position.index.duplicated()]
+
+        position = old_position.reindex(hashes).to_numpy()
+        is_new = np.isnan(position)
+        scored_new = score_dataframe(df[is_new])
+        rescored = int(is_new.sum())
+
+        n_old = len(old_hashes)
+        appended_only = (len(hashes) >= n_old and (position[:n_old] == np.arange(n_old)).all()
+                         and is_new[n_old:].all())
+        if appended_only:
+            # Caso comun (filas nuevas al final): se agregan a _promedios.csv sin reescribirlo
+            acumulados = combinar_acumulados(
+                state["acumulados"], _accumulate(scored_new) if rescored else None)
+            removed = 0
+            scored = None
+        else:
+            previous = pd.read_csv(subscale_file)
+
+            # Armar los resultados en el orden del CSV de entrada
+            scored = pd.concat([
+                previous.iloc[position[~is_new].astype(int)].set_axis(np.flatnonzero(~is_new)),
+                scored_new.set_axis(np.flatnonzero(is_new)),
+            ]).sort_index()
+
+            # Cambio en la cantidad de apariciones de cada fila: +1 agregada, -1 eliminada
+            old_counts = pd.Series(old_hashes).value_counts()
+            new_counts = pd.Series(hashes).value_counts()
+            delta = new_counts.sub(old_counts, fill_value=0)
+            delta = delta[delta != 0]
+
+            added = delta[delta > 0]
+            removed_counts = -delta[delta < 0]
+            first_new = pd.Series(np.arange(len(hashes)), index=hashes)
+            first_new = first_new[~first_new.index.duplicated()]
+            added_rows = scored.iloc[first_new[added.index].to_numpy()]
+            removed_rows = previous.iloc[old_position[removed_counts.index].to_numpy()]
+
+            acumulados = combinar_acumulados(
+                state["acumulados"],
+                _accumulate(added_rows, added.to_numpy(dtype=float)) if len(added_rows) else None,
+                _accumulate(removed_rows, -removed_counts.to_numpy(dtype=float)) if len(removed_rows) else None,
+            )
+            removed = int(removed_counts.sum())
+
+    if scored is not None:
+        tmp_file = f"{subscale_file}.tmp"
+        scored.to_csv(tmp_file, index=False, encoding='utf-8')
+        os.replace(tmp_file, subscale_file)
+    elif rescored:
+        scored_new.to_csv(subscale_file, mode='a', header=False, index=False, encoding='utf-8')
+    save_state(subscale_file, hashes, acumulados)
+
+    df_media, df_de, df_diff = estadisticas_desde_acumulados(acumulados, SCORE_COLUMNS)
+    base_name = os.path.splitext(input_filename)[0]
+    guardar_resultados(os.path.dirname(subscale_file), base_name, df_media, df_de, df_diff)
+    return len(df), rescored, removed
+
+def main():
+    """Actualiza los resultados del archivo elegido reprocesando solo lo que cambio"""
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        data_dir = os.path.join(script_dir, 'Datos_autocompasion')
+
+        selected_file = select_csv_file(data_dir)
+        if not selected_file:
+            print("No se selecciono ningun archivo. Saliendo...")
+            return
+
+        start = time.perf_counter()
+        total, rescored, removed = update_results_incremental(
+            os.path.join(data_dir, selected_file), data_dir, selected_file)
+        save_mapping()
+        print(f"\n¡Actualizacion completada en {time.perf_counter() - start:.2f}s! "
+              f"{total} registros: {rescored} puntuados, {total - rescored} reutilizados, {removed} eliminados.")
+
+    except Exception as e:
+        print(f"Error durante el procesamiento: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os
+import sys
+import csv
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from procesar_subescalas import list_available_files, score_dataframe, save_results
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from anonimizador import anonymize_many, save_mapping
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(script_dir, 'Datos_autocompasion')
+RESULTS_DIR = os.path.join(DATA_DIR, 'Resultados')
+SUMMARY_FILE = os.path.join(RESULTS_DIR, 'resumen_lote.csv')
+
+SUMMARY_COLUMNS = ['Archivo', 'Estado', 'Etapa_fallida', 'Filas', 'Tiempo_puntaje',
+                   'Tiempo_analisis', 'Tiempo_graficos', 'Tiempo_total', 'Error']
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Puntua, analiza y grafica todos los CSV de Datos_autocompasion sin preguntar, "
+                    "y guarda un resumen de tiempos y resultados en Resultados/resumen_lote.csv")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Cantidad de archivos procesados en paralelo (default: 1)")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Vuelve a dibujar todos los graficos aunque sus datos no hayan cambiado")
+    return parser.parse_args()
+
+def preassign_aliases(data_dir, csv_files):
+    """
+    Asigna los alias de todos los participantes antes de repartir los archivos entre procesos,
+    en orden de archivo y de fila (el mismo que procesandolos uno por uno), y guarda el mapa.
+    Asi cada proceso encuentra todos sus participantes ya registrados y no asigna alias propios.
+    """
+    names = []
+    for filename in csv_files:
+        try:
+            column = pd.read_csv(os.path.join(data_dir, filename), usecols=[0]).iloc[:, 0]
+        except (ValueError, OSError) as e:
+            # El archivo se reporta como fallido al procesarlo
+            print(f"No se pudieron leer los participantes de {filename}: {e}")
+            continue
+        # Solo nombres: una columna que no es de texto hace fallar el archivo al puntuarlo
+        names.extend(name for name in column.dropna() if isinstance(name, str))
+    anonymize_many(names)
+    save_mapping()
+
+def _init_worker():
+    """Los graficos se dibujan sin ventana en los procesos del lote"""
+    import matplotlib
+    matplotlib.use("Agg")
+
+def process_file(filename, data_dir=DATA_DIR, force=False):
+    """
+    Puntua, analiza y grafica un archivo. Nunca lanza excepciones: devuelve una fila del resumen
+    con el tiempo de cada etapa y, si alguna fallo, cual fue y el error.
+    """
+    # Importados aqui para que el proceso principal no cargue matplotlib
+    from analisis_subescalas import procesar_base
+    from graficos_autocompasion import generate_all_graphs
+
+    csv_file = os.path.join(data_dir, filename)
+    base_name = os.path.splitext(filename)[0]
+    results_dir = os.path.join(data_dir, 'Resultados')
+    row = {column: None for column in SUMMARY_COLUMNS}
+    row.update({'Archivo': filename, 'Estado': 'ok'})
+    # Los graficos reutilizan las filas puntuadas y el agregado por fase del analisis
+    # (el archivo se puntua una sola vez)
+    analysis = {}
+
+    def score():
+        scored = score_dataframe(pd.read_csv(csv_file))
+        save_results(scored.to_dict('records'), [], data_dir, filename)
+        analysis['scored'] = scored
+        row['Filas'] = len(scored)
+
+    stages = [
+        ('puntaje', score),
+        ('analisis', lambda: analysis.update(agregado=procesar_base(results_dir, base_name))),
+        ('graficos', lambda: generate_all_graphs(csv_file, force=force, agregado=analysis.get('agregado'),
+                                                 df=analysis.get('scored'))),
+    ]
+
+    start_total = time.perf_counter()
+    for stage, run in stages:
+        start = time.perf_counter()
+        try:
+            run()
+        except Exception as e:
+            row.update({'Estado': 'error', 'Etapa_fallida': stage, 'Error': f"{type(e).__name__}: {e}"})
+            break
+        finally:
+            row[f'Tiempo_{stage}'] = round(time.perf_counter() - start, 3)
+    row['Tiempo_total'] = round(time.perf_counter() - start_total, 3)
+    return row
+
+def save_summary(rows, summary_file=SUMMARY_FILE):
+    """Guarda el resumen del lote (una fila por archivo)"""
+    os.makedirs(os.path.dirname(summary_file), exist_ok=True)
+    with open(summary_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Resumen del lote guardado en: {summary_file}")
+
+def run_batch(data_dir=DATA_DIR, workers=1, force=False):
+    """Procesa todos los CSV de data_dir (en paralelo si workers > 1) y devuelve las filas del resumen"""
+    csv_files = list_available_files(data_dir)
+    if not csv_files:
+        print("No se encontraron archivos CSV en el directorio de datos.")
+        return []
+
+    print(f"Archivos a procesar: {len(csv_files)}")
+    preassign_aliases(data_dir, csv_files)
+
+    if workers and workers > 1 and len(csv_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(csv_files)), initializer=_init_worker) as executor:
+            futures = [executor.submit(process_file, filename, data_dir, force) for filename in csv_files]
+            rows = [future.result() for future in futures]
+    else:
+        _init_worker()
+        rows = [process_file(filename, data_dir, force) for filename in csv_files]
+
+    save_summary(rows, os.path.join(data_dir, 'Resultados', 'resumen_lote.csv'))
+    return rows
+
+def main(workers=1, force=False):
+    start = time.perf_counter()
+    rows = run_batch(workers=workers, force=force)
+    failed = [row for row in rows if row['Estado'] != 'ok']
+
+    print(f"\nLote completado en {time.perf_counter() - start:.2f}s: "
+          f"{len(rows) - len(failed)} archivos correctos, {len(failed)} con errores")
+    for row in failed:
+        print(f"  {row['Archivo']} (etapa {row['Etapa_fallida']}): {row['Error']}")
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(workers=args.workers, force=args.forzar)
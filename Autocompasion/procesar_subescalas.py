@@ -1,9 +1,10 @@
 import os
+import argparse
+import numpy as np
 import pandas as pd
 import sys
-import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from anonimizador import anonymize_name, save_mapping
+from anonimizador import anonymize_series, save_mapping
 
 # Define subescalas y sus preguntas correspondientes
 SUBCALES = {
@@ -21,92 +22,158 @@ INVERTED_QUESTIONS = [1, 2, 4, 6, 8, 11, 13, 16, 18, 20, 21, 24, 25]
 # Subescalas negativas que requieren inversión de valores
 NEGATIVE_SUBSCALES = ['Auto-juicio', 'Aislamiento', 'Sobre-identificacion']
 
-def invert_value(value):
-    """Invertir un valor: 1->5, 2->4, 3->3, 4->2, 5->1"""
-    # No se deben poner valores en 0. Todas las preguntas se encuentran respondidas
-    return 6 - value
-
-def calculate_subscale_mean(data, questions, subscale_name):
-    """Calcular la media para una subescala especifica, invirtiendo valores si es una subescala negativa"""
-    values = []
-    for q in questions:
-        if q in data and data[q] != 0:  # Excluir valores faltantes (0)
-            value = data[q]
-            # Si es una subescala negativa, invertir los valores de las preguntas invertidas
+NUM_QUESTIONS = 26
+
+def build_scoring_matrices():
+    """
+    Matrices (26 x subescalas) para puntuar todas las filas de una vez:
+    - directa: 1 si la pregunta suma su valor tal cual a la subescala
+    - invertida: 1 si suma el valor invertido (6 - valor)
+    Cada pregunta pertenece a una sola subescala, asi que directa + invertida es la pertenencia.
+    """
+    direct = np.zeros((NUM_QUESTIONS, len(SUBCALES)))
+    inverted = np.zeros((NUM_QUESTIONS, len(SUBCALES)))
+    for j, (subscale_name, questions) in enumerate(SUBCALES.items()):
+        for q in questions:
             if subscale_name in NEGATIVE_SUBSCALES and q in INVERTED_QUESTIONS:
-                value = invert_value(value)
-            values.append(value)
-    
-    if not values:
-        return 0.0
-    return sum(values) / len(values)
+                inverted[q - 1, j] = 1
+            else:
+                direct[q - 1, j] = 1
+    return direct, inverted
+
+DIRECT_MATRIX, INVERTED_MATRIX = build_scoring_matrices()
 
 def calculate_global_mean(subscale_means):
     """Calcular la media global promediando las medias de las seis subescalas"""
-    # Las subescalas negativas ya tienen sus valores invertidos en calculate_subscale_mean
+    # Las subescalas negativas ya tienen sus valores invertidos (INVERTED_MATRIX en score_answers)
     values = list(subscale_means.values())
     
     if not values:
         return 0.0
     return sum(values) / len(values)
 
+def near_ties(values):
+    """Mascara de los valores de la forma x.xx5, donde el redondeo a 2 decimales depende del ultimo bit"""
+    return np.abs(values * 1000 % 10 - 5) < 1e-6
+
+def round_2(values):
+    """
+    Redondea un arreglo a 2 decimales igual que round(valor, 2) de Python.
+    np.round puede diferir en los casos x.xx5, que se resuelven con round().
+    """
+    rounded = np.round(values, 2)
+    ties = near_ties(values)
+    if ties.any():
+        rounded[ties] = [round(value, 2) for value in values[ties]]
+    return rounded
+
+def score_answers(answers):
+    """
+    Puntuar una matriz (filas x 26) de respuestas en una sola pasada.
+    Los valores 0 o NaN se consideran faltantes y no cuentan para la media.
+    Devuelve (medias de subescalas redondeadas, filas x subescalas; puntaje global redondeado).
+    Las preguntas invertidas de las subescalas negativas suman 6 - valor (1->5, 2->4, ..., 5->1).
+    """
+    # Igual que int(valor) en la version por fila
+    answers = np.trunc(np.asarray(answers, dtype=float))
+    valid = ~np.isnan(answers) & (answers != 0)
+    values = np.where(valid, answers, 0.0)
+    inverted_values = np.where(valid, 6 - answers, 0.0)
+    
+    sums = values @ DIRECT_MATRIX + inverted_values @ INVERTED_MATRIX
+    counts = valid.astype(float) @ (DIRECT_MATRIX + INVERTED_MATRIX)
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    means = round_2(means)
+    
+    global_means = means.mean(axis=1)
+    # En los empates x.xx5 el resultado depende de como se sumaron las medias:
+    # esas filas se calculan con calculate_global_mean, igual que la version original por fila
+    ties = near_ties(global_means)
+    global_means = np.round(global_means, 2)
+    for i in np.flatnonzero(ties):
+        row_means = dict(zip(SUBCALES, means[i].tolist()))
+        global_means[i] = round(calculate_global_mean(row_means), 2)
+    return means, global_means
+
+def check_survey_schema(df):
+    """
+    Verificar que el DataFrame tenga el formato de la encuesta: Participante, Fase y las 26 respuestas
+    (numericas). Lanza ValueError con un mensaje claro si no es asi.
+    """
+    expected = 2 + NUM_QUESTIONS
+    if df.shape[1] < expected:
+        raise ValueError(f"Formato de encuesta invalido: se esperaban {expected} columnas "
+                         f"(Participante, Fase y las {NUM_QUESTIONS} respuestas) y el archivo tiene {df.shape[1]}")
+    if df.empty:
+        # Sin filas no hay respuestas que revisar (read_csv deja esas columnas como texto)
+        return
+    answers = df.iloc[:, 2:expected]
+    non_numeric = [str(column) for column, dtype in answers.dtypes.items()
+                   if not pd.api.types.is_numeric_dtype(dtype)]
+    if non_numeric:
+        raise ValueError(f"Formato de encuesta invalido: respuestas no numericas en las columnas "
+                         f"{', '.join(non_numeric)}")
+
+def score_dataframe(df):
+    """
+    Puntuar un DataFrame de la encuesta (Participante, Fase, 1, 2, ..., 26) de forma vectorizada.
+    Devuelve un DataFrame con Participante (alias), Fase, las medias de cada subescala y Puntaje_global.
+    """
+    check_survey_schema(df)
+    means, global_means = score_answers(df.iloc[:, 2:2 + NUM_QUESTIONS].to_numpy(dtype=float))
+    
+    results = pd.DataFrame(means, columns=list(SUBCALES), index=df.index)
+    results.insert(0, 'Participante', anonymize_series(df.iloc[:, 0]))
+    results.insert(1, 'Fase', "FASE " + df.iloc[:, 1].astype(str).str.strip())
+    results['Puntaje_global'] = global_means
+    return results.reset_index(drop=True)
+
 def process_experience_data(csv_file_path):
     """Procesar los datos de la experiencia CSV usando pandas"""
     
     # Leer el archivo CSV con pandas
     df = pd.read_csv(csv_file_path)
     
-    # Almacenamiento de resultados
-    subscale_results = []
+    # Cada fila representa una combinacion de participante-fase; se puntuan todas juntas
+    subscale_results = score_dataframe(df).to_dict('records')
     global_results = []
     
-    # Procesar cada fila (cada fila representa una combinacion de participante-fase)
-    for row in df.itertuples(index=False, name=None):
-        # row es una tupla: (Participante, Fase, 1, 2, 3, ..., 26)
-        real_participant = row[0]
-        participant = anonymize_name(real_participant)
-        phase_value = str(row[1]).strip()
-        phase = f"FASE {phase_value}"
-        
-        # Extraer valores de preguntas para este participante-fase
-        participant_data = {}
-        for question in range(1, 27):
-            value = row[question+1]
-            if pd.notna(value):  # Verificar si el valor no es NaN
-                participant_data[question] = int(value)
-            else:
-                participant_data[question] = 0
-        
-        # Calcular medias de subescalas
-        subscale_means = {}
-        for subscale_name, questions in SUBCALES.items():
-            mean = calculate_subscale_mean(participant_data, questions, subscale_name)
-            subscale_means[subscale_name] = round(mean, 2)
-        
-        # Calcular media global
-        global_mean = round(calculate_global_mean(subscale_means), 2)
-        
-        # Almacenar resultados
-        subscale_row = {
-            'Participante': participant,
-            'Fase': phase,
-            **subscale_means,
-            'Puntaje_global': global_mean
-        }
-        subscale_results.append(subscale_row)
-    
     return subscale_results, global_results
 
+def results_file_path(output_dir, input_filename):
+    """Ruta de <base>_promedios.csv dentro de output_dir/Resultados (crea el directorio)"""
+    results_dir = os.path.join(output_dir, 'Resultados')
+    os.makedirs(results_dir, exist_ok=True)
+    base_name = os.path.splitext(input_filename)[0]  # Eliminar la extension .csv
+    return os.path.join(results_dir, f'{base_name}_promedios.csv')
+
+def process_experience_data_streaming(csv_file_path, subscale_file, chunksize=100000):
+    """
+    Procesar el CSV por bloques de chunksize filas, con memoria acotada:
+    cada bloque se puntua y se agrega directamente a subscale_file.
+    El archivo se escribe en uno temporal y se reemplaza al terminar, asi un error
+    a mitad de camino no deja resultados parciales. Sin filas de datos no se escribe nada
+    (igual que save_results). Devuelve la cantidad de filas procesadas.
+    """
+    tmp_file = f"{subscale_file}.tmp"
+    total_rows = 0
+    try:
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            for chunk in pd.read_csv(csv_file_path, chunksize=chunksize):
+                score_dataframe(chunk).to_csv(f, index=False, header=total_rows == 0)
+                total_rows += len(chunk)
+        if total_rows:
+            os.replace(tmp_file, subscale_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return total_rows
+
 def save_results(subscale_results, global_results, output_dir, input_filename):
     """Guardar resultados en archivos CSV usando pandas"""
     
     # Crear directorio de resultados dentro del directorio de datos
-    results_dir = os.path.join(output_dir, 'Resultados')
-    os.makedirs(results_dir, exist_ok=True)
-    
-    # Generar nombres de salida basados en el nombre de archivo de entrada
-    base_name = os.path.splitext(input_filename)[0]  # Eliminar la extension .csv
-    subscale_file = os.path.join(results_dir, f'{base_name}_promedios.csv')
+    subscale_file = results_file_path(output_dir, input_filename)
     
     # Guardar resultados combinados (subescalas + Media_Global)
     if subscale_results:
@@ -150,7 +217,15 @@ def select_csv_file(data_dir):
         except ValueError:
             print("Por favor ingrese un numero valido")
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Calcula las medias de subescalas de autocompasion")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Lee el CSV por bloques y escribe los resultados a medida que avanza (memoria acotada)")
+    parser.add_argument("--chunksize", type=int, default=100000,
+                        help="Filas por bloque en modo --streaming (default: 100000)")
+    return parser.parse_args()
+
+def main(streaming=False, chunksize=100000):
     """Funcion principal para procesar los datos de la experiencia"""
     try:
         # Definir rutas de archivos
@@ -167,19 +242,28 @@ def main():
         
         print(f"\nProcesando archivo: {selected_file}")
         
-        # Procesar los datos
-        subscale_results, global_results = process_experience_data(csv_file)
-        
-        # Guardar resultados
-        save_results(subscale_results, global_results, data_dir, selected_file)
+        if streaming:
+            # Puntuar y escribir bloque por bloque
+            subscale_file = results_file_path(data_dir, selected_file)
+            processed = process_experience_data_streaming(csv_file, subscale_file, chunksize)
+            if processed:
+                print(f"Resultados combinados guardados en: {subscale_file}")
+        else:
+            # Procesar los datos
+            subscale_results, global_results = process_experience_data(csv_file)
+            processed = len(subscale_results)
+            
+            # Guardar resultados
+            save_results(subscale_results, global_results, data_dir, selected_file)
 
         # Guardar el mapa real -> alias en la carpeta Metricas/ 
         save_mapping()
         
-        print(f"\n¡Procesamiento completado! Se procesaron {len(subscale_results)} registros.")
+        print(f"\n¡Procesamiento completado! Se procesaron {processed} registros.")
         
     except Exception as e:
         print(f"Error durante el procesamiento: {e}")
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(streaming=args.streaming, chunksize=args.chunksize)
@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from analisis_subescalas import _read_results_files, _prepare_dataframe, _identify_subscale_columns, _listar_bases_disponibles
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from remuestreo import DEFAULT_RESAMPLES, independent_seeds, paired_bootstrap, sign_flip_test
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(script_dir, 'Datos_autocompasion', 'Resultados')
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Cambios PRE/POST pareados por participante: tamano de efecto, intervalos bootstrap "
+                    "y p-valores de permutacion por subescala y fase. Genera <base>_remuestreo.csv")
+    parser.add_argument("--base", help="Base a procesar (default: todas las de Resultados/)")
+    parser.add_argument("--remuestreos", type=int, default=DEFAULT_RESAMPLES,
+                        help=f"Remuestreos bootstrap y permutaciones (default: {DEFAULT_RESAMPLES})")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla para resultados reproducibles (default: 0)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos para repartir los remuestreos (default: 1; no cambia el resultado)")
+    return parser.parse_args()
+
+def paired_differences(df, subscale_cols):
+    """
+    Diferencias POST - PRE por participante para cada fase.
+    Devuelve {fase: (pre, post)} con DataFrames indexados por participante, solo con los
+    participantes que tienen PRE y POST completos (filas repetidas se promedian).
+    """
+    pairs = {}
+    means = df.groupby(["Fase_Numero", "Participante", "Etapa"], observed=True)[subscale_cols].mean()
+    for fase_num, fase_df in means.groupby(level="Fase_Numero"):
+        wide = fase_df.droplevel("Fase_Numero").unstack("Etapa").dropna()
+        if wide.empty or "PRE" not in wide.columns.get_level_values(1) or "POST" not in wide.columns.get_level_values(1):
+            continue
+        pre = wide.xs("PRE", axis=1, level=1)[subscale_cols]
+        post = wide.xs("POST", axis=1, level=1)[subscale_cols]
+        pairs[int(fase_num)] = (pre, post)
+    return pairs
+
+def resample_phase(pre, post, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1):
+    """Estadisticas pareadas de todas las columnas de una fase (un DataFrame con una fila por columna)"""
+    diffs = (post - pre).to_numpy(dtype=float)
+    # Semillas hijas distintas: el bootstrap y el test de permutacion no comparten sorteos
+    bootstrap_seed, permutation_seed = independent_seeds(seed, 2)
+    bootstrap = paired_bootstrap(diffs, n_resamples, seed=bootstrap_seed, workers=workers)
+    p_values, exact = sign_flip_test(diffs, n_resamples, seed=permutation_seed, workers=workers)
+    return pd.DataFrame({
+        "Columna": pre.columns,
+        "N_pares": len(diffs),
+        "Media_PRE": pre.mean().to_numpy(),
+        "Media_POST": post.mean().to_numpy(),
+        "Diferencia": bootstrap["media"],
+        "DE_diferencia": diffs.std(axis=0, ddof=1) if len(diffs) > 1 else np.nan,
+        "d_z": bootstrap["d_z"],
+        "IC95_inf": bootstrap["ic_inf"],
+        "IC95_sup": bootstrap["ic_sup"],
+        "d_z_IC95_inf": bootstrap["d_z_ic_inf"],
+        "d_z_IC95_sup": bootstrap["d_z_ic_sup"],
+        "p_permutacion": p_values,
+        "p_exacto": exact,
+    })
+
+def procesar_base(resultados_dir, base_name, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1):
+    """Genera <base>_remuestreo.csv junto a <base>_analisis.csv y lo devuelve como DataFrame"""
+    df = _prepare_dataframe(_read_results_files(resultados_dir, base_name))
+    subscale_cols = _identify_subscale_columns(df)
+
+    tables = []
+    for fase_num, (pre, post) in paired_differences(df, subscale_cols).items():
+        # Semilla propia de cada fase: agregar una fase no cambia los resultados de las demas
+        table = resample_phase(pre, post, n_resamples, seed=[seed, fase_num], workers=workers)
+        table.insert(0, "Fase", fase_num)
+        tables.append(table)
+
+    if not tables:
+        print(f"{base_name}: no hay participantes con PRE y POST en una misma fase")
+        return None
+    result = pd.concat(tables, ignore_index=True)
+    numeric = result.select_dtypes("float").columns
+    result[numeric] = result[numeric].round(4)
+
+    out_path = os.path.join(resultados_dir, f"{base_name}_remuestreo.csv")
+    result.to_csv(out_path, index=False, encoding="utf-8")
+    print(f"Guardado: {out_path}")
+    return result
+
+def main(base=None, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1):
+    bases = [base] if base else _listar_bases_disponibles(RESULTS_DIR)
+    if not bases:
+        print("No se encontraron archivos *_promedios.csv en la carpeta de resultados.")
+        return
+
+    for base_name in bases:
+        start = time.perf_counter()
+        try:
+            procesar_base(RESULTS_DIR, base_name, n_resamples, seed, workers)
+        except Exception as e:
+            print(f"Error procesando {base_name}: {e}")
+            continue
+        print(f"{base_name}: {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.base, args.remuestreos, args.semilla, args.workers)
@@ -0,0 +1,96 @@
+import os
+import pandas as pd
+from procesar_metricas import METRICS
+
+# One uncompressed Feather file per phase, so readers can memory-map them:
+#   datos_procesados/Fase1.feather, datos_procesados/Fase2.feather, ...
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_DIR = os.path.join(script_dir, "datos_procesados")
+
+COUNT_COLUMNS = ["collider_entries", "sound_decrements", "flower_openings"]
+
+def person_results_to_frame(person_results):
+    """
+    Flatten person_results into one typed row per participant and phase.
+    Participant and phase are categorical; metrics keep full precision (the CSV rounds them).
+    """
+    rows = []
+    for person, phases in person_results.items():
+        for phase, summary in phases.items():
+            rows.append({"participant": person, "phase": phase,
+                         **{key: summary[key] for key in METRICS}})
+
+    df = pd.DataFrame(rows, columns=["participant", "phase", *METRICS.keys()])
+    df["participant"] = df["participant"].astype("category")
+    df["phase"] = df["phase"].astype("category")
+    for key in METRICS:
+        df[key] = df[key].astype("int64" if key in COUNT_COLUMNS else "float64")
+    return df.sort_values(["phase", "participant"], kind="stable").reset_index(drop=True)
+
+def save_columnar(person_results, store_dir=DEFAULT_STORE_DIR):
+    """
+    Write the processed metrics as one Feather file per phase.
+    Partitions of phases that no longer have data are removed.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    os.makedirs(store_dir, exist_ok=True)
+    df = person_results_to_frame(person_results)
+
+    written = set()
+    for phase, part in df.groupby("phase", observed=True):
+        part = part.drop(columns=["phase"]).reset_index(drop=True)
+        part["participant"] = part["participant"].cat.remove_unused_categories()
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        path = os.path.join(store_dir, f"{phase}.feather")
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+        written.add(os.path.basename(path))
+
+    for filename in os.listdir(store_dir):
+        if filename.endswith(".feather") and filename not in written:
+            os.remove(os.path.join(store_dir, filename))
+
+    print(f"Datos procesados (Feather por fase) guardados en: {store_dir}")
+
+def list_phases(store_dir=DEFAULT_STORE_DIR):
+    """Phases available in the store"""
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(f[:-len(".feather")] for f in os.listdir(store_dir) if f.endswith(".feather"))
+
+def load_processed_table(phases=None, store_dir=DEFAULT_STORE_DIR):
+    """
+    Load the processed metrics as a DataFrame, memory-mapping the Feather files.
+    phases: list of phases to read (default: all).
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    if phases is None:
+        phases = list_phases(store_dir)
+    if not phases:
+        raise FileNotFoundError(f"No hay datos procesados en: {store_dir}")
+
+    tables = []
+    for phase in phases:
+        table = feather.read_table(os.path.join(store_dir, f"{phase}.feather"), memory_map=True)
+        phase_column = pa.array([phase] * table.num_rows, type=pa.string()).dictionary_encode()
+        tables.append(table.add_column(1, "phase", phase_column))
+
+    table = pa.concat_tables(tables, promote_options="permissive")
+    return table.to_pandas()
+
+def load_person_results(phases=None, store_dir=DEFAULT_STORE_DIR):
+    """Load the store as the {participant: {phase: summary}} structure of process_all_files"""
+    df = load_processed_table(phases, store_dir)
+    person_results = {}
+    records = df.astype({"participant": str, "phase": str}).to_dict("records")
+    for record in records:
+        summary = {key: record[key] for key in METRICS}
+        for key in COUNT_COLUMNS:
+            summary[key] = int(summary[key])
+        person_results.setdefault(record["participant"], {})[record["phase"]] = summary
+    return person_results
@@ -1,63 +1,49 @@
 import os
 import csv
-import statistics
 from collections import defaultdict
 from procesar_metricas import process_all_files, METRICS
+from estadisticas_streaming import StreamingStats
 
-def calculate_descriptive_stats(values):
+def accumulate_metric_stats(person_results, accumulators=None):
     """
-    Calculate descriptive statistics for a list of numeric values.
-    Returns a dictionary with mean, std_dev, min, max.
+    Update one StreamingStats per phase and metric, one session at a time.
+    Pass the accumulators of a previous call (or merge() those of other shards)
+    to keep adding sessions without holding their values in memory.
+    Returns: {phase: {metric: StreamingStats}}
     """
-    if not values:
-        return {"mean": 0, "std_dev": 0, "min": 0, "max": 0}
+    if accumulators is None:
+        accumulators = defaultdict(lambda: defaultdict(StreamingStats))
     
-    try:
-        return {
-            "mean": statistics.mean(values),
-            "std_dev": statistics.stdev(values) if len(values) > 1 else 0,
-            "min": min(values),
-            "max": max(values)
-        }
-    except statistics.StatisticsError:
-        return {"mean": 0, "std_dev": 0, "min": 0, "max": 0}
-
-def collect_metric_values_by_phase(person_results):
-    """
-    Collect all values for each metric in each phase across all participants.
-    Returns: {phase: {metric: [values]}}
-    """
-    metric_values = defaultdict(lambda: defaultdict(list))
-    
-    # Get all metric keys from METRICS
     metric_keys = list(METRICS.keys())
     
     for person, phases in person_results.items():
         for phase, summary in phases.items():
             for metric_key in metric_keys:
                 if metric_key in summary:
-                    metric_values[phase][metric_key].append(summary[metric_key])
+                    accumulators[phase][metric_key].update(summary[metric_key])
     
-    return metric_values
+    return accumulators
 
-def generate_descriptive_analysis():
+def generate_descriptive_analysis(person_results=None):
     """
     Generate descriptive analysis for all metrics across all phases.
+    person_results: already processed results (default: process all files).
     Returns a list of dictionaries with the analysis results.
     """
     # Process all files to get the data
-    person_results = process_all_files()
+    if person_results is None:
+        person_results = process_all_files()
     
-    # Collect values by phase and metric
-    metric_values = collect_metric_values_by_phase(person_results)
+    # Accumulate statistics by phase and metric
+    accumulators = accumulate_metric_stats(person_results)
     
     # Calculate descriptive statistics
     analysis_results = []
     
-    for phase in sorted(metric_values.keys()):
-        for metric_key in sorted(metric_values[phase].keys()):
-            values = metric_values[phase][metric_key]
-            stats = calculate_descriptive_stats(values)
+    for phase in sorted(accumulators.keys()):
+        for metric_key in sorted(accumulators[phase].keys()):
+            accumulator = accumulators[phase][metric_key]
+            stats = accumulator.summary()
             
             # Get the Spanish name for the metric
             metric_name = METRICS[metric_key]
@@ -66,11 +52,14 @@ def generate_descriptive_analysis():
                 "Fase": phase,
                 "Metrica": metric_name,
                 "Metrica_Key": metric_key,
-                "N_Participantes": len(values),
+                "N_Participantes": accumulator.count,
                 "Media": round(stats["mean"], 2),
                 "Desv_Estandar": round(stats["std_dev"], 2),
                 "Minimo": stats["min"],
-                "Maximo": stats["max"]
+                "Maximo": stats["max"],
+                "Mediana": round(stats["median"], 2),
+                "Q1": round(stats["q1"], 2),
+                "Q3": round(stats["q3"], 2)
             }
             analysis_results.append(result)
     
@@ -90,7 +79,7 @@ def save_to_csv(analysis_results, filename="analisis_descriptivo.csv"):
     
     fieldnames = [
         "Fase", "Metrica", "Metrica_Key", "N_Participantes", 
-        "Media", "Desv_Estandar", "Minimo", "Maximo"
+        "Media", "Desv_Estandar", "Minimo", "Maximo", "Mediana", "Q1", "Q3"
     ]
     
     with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
@@ -117,15 +106,15 @@ def print_summary_table(analysis_results):
     
     for phase in phases:
         print(f"\n{phase.upper()}")
-        print("-" * 80)
-        print(f"{'Metrica':<35} {'N':<3} {'Media':<8} {'Desv.Est':<8} {'Min':<6} {'Max':<6}")
-        print("-" * 80)
+        print("-" * 88)
+        print(f"{'Metrica':<35} {'N':<3} {'Media':<8} {'Desv.Est':<8} {'Min':<6} {'Max':<6} {'Mediana':<8}")
+        print("-" * 88)
         
         phase_results = [r for r in analysis_results if r["Fase"] == phase]
         for result in phase_results:
             print(f"{result['Metrica']:<35} {result['N_Participantes']:<3} "
                   f"{result['Media']:<8.2f} {result['Desv_Estandar']:<8.2f} "
-                  f"{result['Minimo']:<6.1f} {result['Maximo']:<6.1f}")
+                  f"{result['Minimo']:<6.1f} {result['Maximo']:<6.1f} {result['Mediana']:<8.2f}")
     
     print("\n" + "="*100)
 
@@ -0,0 +1,42 @@
+import re
+import random
+import timeit
+from procesar_metricas import sum_durations
+
+def per_line_total(values):
+    """Previous per-line extraction, kept here only as the baseline for the comparison"""
+    def parse_seconds_from_string(s):
+        match = re.search(r"Duracion: ([\d,.]+) segundos", s)
+        if match:
+            return float(match.group(1).replace(",", "."))
+        return 0.0
+    return sum(parse_seconds_from_string(v) for v in values if v.strip())
+
+def build_lines(n, seed=0):
+    """Synthetic immobility/flower lines, with some empty and non-matching lines mixed in"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.05:
+            lines.append("")
+        elif r < 0.10:
+            lines.append("9:53:51: Flor cerrada")
+        else:
+            seconds = f"{rng.randint(0, 120)},{rng.randint(0, 9)}"
+            lines.append(f"Inmovilidad: 9:40:28 | Movimiento: 9:40:30 | Duracion: {seconds} segundos")
+    return lines
+
+def main():
+    print(f"{'Lineas':>8} {'Por linea (ms)':>15} {'En bloque (ms)':>15} {'Mejora':>8}")
+    for n in [1_000, 10_000, 100_000]:
+        values = build_lines(n)
+        assert abs(per_line_total(values) - sum_durations(values)) < 1e-6
+
+        repeat = max(3, 200_000 // n)
+        t_line = min(timeit.repeat(lambda: per_line_total(values), number=1, repeat=repeat))
+        t_bulk = min(timeit.repeat(lambda: sum_durations(values), number=1, repeat=repeat))
+        print(f"{n:>8} {t_line * 1000:>15.2f} {t_bulk * 1000:>15.2f} {t_line / t_bulk:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+
+# Bump this when process_file changes what it returns, so old entries are discarded
+CACHE_VERSION = 1
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_FILE = os.path.join(script_dir, ".cache_metricas.json")
+
+def _cache_key(filepath):
+    """Key entries by path relative to Metricas/, so the cache survives moving the repo"""
+    return os.path.relpath(os.path.abspath(filepath), script_dir).replace(os.sep, "/")
+
+def file_hash(filepath, block_size=1 << 20):
+    """SHA-256 of the file content"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_cache(cache_file=DEFAULT_CACHE_FILE):
+    """
+    Load the summary cache from disk.
+    Returns an empty cache if the file is missing, unreadable or from another version.
+    """
+    empty = {"version": CACHE_VERSION, "files": {}}
+    if not os.path.exists(cache_file):
+        return empty
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return empty
+    if cache.get("version") != CACHE_VERSION or not isinstance(cache.get("files"), dict):
+        return empty
+    return cache
+
+def save_cache(cache, cache_file=DEFAULT_CACHE_FILE):
+    """Write the cache atomically (temp file + rename) so an interrupted run can't corrupt it"""
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+def lookup(cache, filepath):
+    """
+    Look up the cached summary of a session file.
+    Returns (summary, digest): summary is None when the file is new or its content changed.
+    Files whose mtime and size are unchanged are trusted without reading them;
+    otherwise the content hash decides.
+    """
+    st = os.stat(filepath)
+    entry = cache["files"].get(_cache_key(filepath))
+    if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+        return entry["summary"], entry["sha256"]
+
+    digest = file_hash(filepath)
+    if entry and entry["sha256"] == digest:
+        # Touched but not modified: refresh the signature and reuse the summary
+        entry["mtime_ns"] = st.st_mtime_ns
+        entry["size"] = st.st_size
+        return entry["summary"], digest
+    return None, digest
+
+def store(cache, filepath, summary, digest):
+    """Store the summary of a session file together with its signature"""
+    st = os.stat(filepath)
+    cache["files"][_cache_key(filepath)] = {
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": digest,
+        "summary": summary
+    }
+
+def evict_missing(cache, filepaths):
+    """Remove entries for files that are no longer present. Returns the number of evicted entries."""
+    keep = {_cache_key(p) for p in filepaths}
+    stale = [key for key in cache["files"] if key not in keep]
+    for key in stale:
+        del cache["files"][key]
+    return len(stale)
@@ -0,0 +1,184 @@
+import os
+import csv
+import sys
+import argparse
+from itertools import combinations
+import numpy as np
+from procesar_metricas import process_all_files, METRICS
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from remuestreo import DEFAULT_RESAMPLES, sign_flip_test, signed_ranks
+
+FIELDNAMES = [
+    "Fase_A", "Fase_B", "Metrica", "Metrica_Key", "N_Pares", "Media_A", "Media_B",
+    "Diferencia_Media", "Mediana_Diferencia", "W", "p_Wilcoxon", "r_Rango_Biserial",
+    "p_Permutacion", "Exacto"
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compara cada metrica entre fases, pareando por participante "
+                    "(Wilcoxon de rangos con signo y test de permutacion)")
+    parser.add_argument("--permutaciones", type=int, default=DEFAULT_RESAMPLES,
+                        help=f"Permutaciones Monte Carlo si no se puede enumerar todas (default: {DEFAULT_RESAMPLES})")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla para resultados reproducibles (default: 0)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos para repartir las permutaciones (default: 1; no cambia el resultado)")
+    return parser.parse_args()
+
+def paired_metric_matrix(person_results, phase_a, phase_b, metric_keys=None):
+    """
+    Paired values of every metric for the participants that have both phases.
+    Returns (aliases, values_a, values_b) with one (participants x metrics) matrix per phase.
+    """
+    if metric_keys is None:
+        metric_keys = list(METRICS.keys())
+    aliases = sorted(person for person, phases in person_results.items()
+                     if phase_a in phases and phase_b in phases)
+    values_a = np.array([[person_results[p][phase_a].get(k, np.nan) for k in metric_keys] for p in aliases], dtype=float)
+    values_b = np.array([[person_results[p][phase_b].get(k, np.nan) for k in metric_keys] for p in aliases], dtype=float)
+    shape = (len(aliases), len(metric_keys))
+    return aliases, values_a.reshape(shape), values_b.reshape(shape)
+
+def compare_phase_pair(values_a, values_b, n_permutations=DEFAULT_RESAMPLES, seed=0, workers=1):
+    """
+    Test every metric (column) of a paired comparison in one batch.
+    Both tests run on the same sign-flip kernel: on the signed ranks of the differences it is the
+    Wilcoxon signed-rank test, on the raw differences a permutation test of the mean difference.
+    Returns a dict of per-metric arrays.
+    """
+    diffs = values_b - values_a
+    ranks = signed_ranks(diffs)
+    positive = np.where(ranks > 0, ranks, 0).sum(axis=0)
+    negative = np.where(ranks < 0, -ranks, 0).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rank_biserial = np.where(positive + negative > 0, (positive - negative) / (positive + negative), 0.0)
+
+    # Both tests for all metrics in a single batch: columns = [signed ranks | raw differences]
+    k = diffs.shape[1]
+    p_values, exact = sign_flip_test(np.hstack([ranks, diffs]), n_permutations, seed=seed,
+                                     workers=workers, packed_signs=True)
+    p_wilcoxon, p_permutation = p_values[:k], p_values[k:]
+    empty = len(diffs) == 0
+    return {
+        "n": len(diffs),
+        "mean_a": np.full(diffs.shape[1], np.nan) if empty else values_a.mean(axis=0),
+        "mean_b": np.full(diffs.shape[1], np.nan) if empty else values_b.mean(axis=0),
+        "median_diff": np.full(diffs.shape[1], np.nan) if empty else np.median(diffs, axis=0),
+        "w": np.minimum(positive, negative),
+        "p_wilcoxon": p_wilcoxon,
+        "rank_biserial": rank_biserial,
+        "p_permutation": p_permutation,
+        "exact": exact,
+    }
+
+def compare_phases(person_results=None, phase_pairs=None, n_permutations=DEFAULT_RESAMPLES, seed=0, workers=1):
+    """
+    Paired comparison of all metrics for each pair of phases, matched by participant alias.
+    phase_pairs: list of (phase_a, phase_b) (default: every pair of phases, in order).
+    Returns a list of dictionaries (one per phase pair and metric).
+    """
+    if person_results is None:
+        person_results = process_all_files()
+
+    phases = sorted({phase for phases in person_results.values() for phase in phases})
+    if phase_pairs is None:
+        phase_pairs = list(combinations(phases, 2))
+
+    metric_keys = list(METRICS.keys())
+    comparison_results = []
+    for phase_a, phase_b in phase_pairs:
+        _, values_a, values_b = paired_metric_matrix(person_results, phase_a, phase_b, metric_keys)
+        # Drop participants with a missing metric so every column is tested on the same pairs
+        complete = ~(np.isnan(values_a).any(axis=1) | np.isnan(values_b).any(axis=1))
+        values_a, values_b = values_a[complete], values_b[complete]
+
+        # Seed derived from the phases, so adding a phase does not change the other pairs
+        pair_seed = [seed, phases.index(phase_a), phases.index(phase_b)]
+        stats = compare_phase_pair(values_a, values_b, n_permutations, seed=pair_seed, workers=workers)
+
+        for j, metric_key in enumerate(metric_keys):
+            comparison_results.append({
+                "Fase_A": phase_a,
+                "Fase_B": phase_b,
+                "Metrica": METRICS[metric_key],
+                "Metrica_Key": metric_key,
+                "N_Pares": stats["n"],
+                "Media_A": round(stats["mean_a"][j], 2),
+                "Media_B": round(stats["mean_b"][j], 2),
+                "Diferencia_Media": round(stats["mean_b"][j] - stats["mean_a"][j], 2),
+                "Mediana_Diferencia": round(stats["median_diff"][j], 2),
+                "W": stats["w"][j],
+                "p_Wilcoxon": round(stats["p_wilcoxon"][j], 4),
+                "r_Rango_Biserial": round(stats["rank_biserial"][j], 2),
+                "p_Permutacion": round(stats["p_permutation"][j], 4),
+                "Exacto": stats["exact"]
+            })
+
+    return comparison_results
+
+def save_to_csv(comparison_results, filename="comparacion_fases.csv"):
+    """
+    Save the phase comparison to a CSV file next to this script.
+    """
+    if not comparison_results:
+        print("No hay datos para guardar.")
+        return
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    filepath = os.path.join(script_dir, filename)
+
+    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(comparison_results)
+
+    print(f"Comparacion entre fases guardada en: {filepath}")
+
+def print_summary_table(comparison_results):
+    """
+    Print a formatted summary table of the phase comparison.
+    """
+    if not comparison_results:
+        print("No hay datos para mostrar.")
+        return
+
+    print("\n" + "="*100)
+    print("COMPARACION ENTRE FASES (pareada por participante)")
+    print("="*100)
+
+    pairs = sorted(set((r["Fase_A"], r["Fase_B"]) for r in comparison_results))
+    for phase_a, phase_b in pairs:
+        pair_results = [r for r in comparison_results if r["Fase_A"] == phase_a and r["Fase_B"] == phase_b]
+        print(f"\n{phase_a.upper()} vs {phase_b.upper()} (N = {pair_results[0]['N_Pares']})")
+        print("-" * 96)
+        print(f"{'Metrica':<35} {'Media A':<8} {'Media B':<8} {'Dif.':<8} {'W':<7} {'p Wilc.':<8} {'r':<6} {'p Perm.':<8}")
+        print("-" * 96)
+        for result in pair_results:
+            print(f"{result['Metrica']:<35} {result['Media_A']:<8.2f} {result['Media_B']:<8.2f} "
+                  f"{result['Diferencia_Media']:<8.2f} {result['W']:<7.1f} {result['p_Wilcoxon']:<8.4f} "
+                  f"{result['r_Rango_Biserial']:<6.2f} {result['p_Permutacion']:<8.4f}")
+
+    print("\n" + "="*100)
+
+def main(n_permutations=DEFAULT_RESAMPLES, seed=0, workers=1):
+    """
+    Main function to run the phase comparison.
+    """
+    try:
+        print("Comparando fases...")
+
+        comparison_results = compare_phases(n_permutations=n_permutations, seed=seed, workers=workers)
+
+        if not comparison_results:
+            print("No se encontraron datos para comparar.")
+            return
+
+        print_summary_table(comparison_results)
+        save_to_csv(comparison_results)
+
+    except Exception as e:
+        print(f"Error durante la comparacion: {e}")
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.permutaciones, args.semilla, args.workers)
@@ -0,0 +1,177 @@
+import math
+
+class StreamingStats:
+    """
+    Constant-memory descriptive statistics, updated one value at a time.
+
+    - count/mean/variance with Welford's algorithm (sample variance, ddof=1)
+    - min/max
+    - the mean is an int when every value is an int and the mean is whole, and the
+      standard deviation of fewer than two values is 0 (same output as the statistics module)
+    - quantiles (median, IQR, percentiles): exact while count <= exact_limit,
+      then a log-bucket sketch (DDSketch) with the given relative accuracy
+
+    Accumulators built on different shards or workers can be combined with merge().
+    Bucket counts simply add up, so the merged quantile sketch is the same one a
+    single pass over all the values would have built.
+    """
+
+    def __init__(self, relative_accuracy=0.01, exact_limit=1024):
+        self.relative_accuracy = relative_accuracy
+        self.exact_limit = exact_limit
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        # Exact sum while every value is an int (None after the first non-int value)
+        self._int_sum = 0
+        # Raw values while the accumulator is small; None once it switched to the sketch
+        self._values = []
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive = {}
+        self._negative = {}
+        self._zeros = 0
+
+    def update(self, value):
+        """Add one value"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+        if self._int_sum is not None:
+            self._int_sum = self._int_sum + value if isinstance(value, int) else None
+
+        if self._values is not None:
+            self._values.append(value)
+            if len(self._values) > self.exact_limit:
+                self._to_sketch()
+        else:
+            self._add_to_sketch(value, 1)
+        return self
+
+    def extend(self, values):
+        """Add several values"""
+        for value in values:
+            self.update(value)
+        return self
+
+    def merge(self, other):
+        """Combine another accumulator into this one (in place) and return self"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge accumulators with different relative accuracy")
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+
+        # Chan et al. parallel update of mean and sum of squared deviations
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        if self._int_sum is not None:
+            self._int_sum = None if other._int_sum is None else self._int_sum + other._int_sum
+
+        if self._values is not None and other._values is not None and total <= self.exact_limit:
+            self._values.extend(other._values)
+        else:
+            if self._values is not None:
+                self._to_sketch()
+            if other._values is not None:
+                for value in other._values:
+                    self._add_to_sketch(value, 1)
+            else:
+                for key, n in other._positive.items():
+                    self._positive[key] = self._positive.get(key, 0) + n
+                for key, n in other._negative.items():
+                    self._negative[key] = self._negative.get(key, 0) + n
+                self._zeros += other._zeros
+        return self
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std_dev(self):
+        return math.sqrt(max(self.variance, 0.0))
+
+    @property
+    def is_exact(self):
+        """True while quantiles are computed from the raw values"""
+        return self._values is not None
+
+    def quantile(self, q):
+        """Value at quantile q in [0, 1] (linear interpolation while exact)"""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return 0
+        if self._values is not None:
+            values = sorted(self._values)
+            position = q * (len(values) - 1)
+            lower = math.floor(position)
+            upper = min(lower + 1, len(values) - 1)
+            return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self._negative, reverse=True):
+            seen += self._negative[key]
+            if seen > rank:
+                return max(-self._bucket_value(key), self.min)
+        seen += self._zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._positive):
+            seen += self._positive[key]
+            if seen > rank:
+                return min(self._bucket_value(key), self.max)
+        return self.max
+
+    def summary(self):
+        """Dictionary with mean, std_dev, min, max, median, q1 and q3"""
+        if self.count == 0:
+            return {"mean": 0, "std_dev": 0, "min": 0, "max": 0, "median": 0, "q1": 0, "q3": 0}
+        mean = self.mean
+        if self._int_sum is not None and self._int_sum % self.count == 0:
+            mean = self._int_sum // self.count
+        return {
+            "mean": mean,
+            "std_dev": self.std_dev if self.count > 1 else 0,
+            "min": self.min,
+            "max": self.max,
+            "median": self.quantile(0.5),
+            "q1": self.quantile(0.25),
+            "q3": self.quantile(0.75)
+        }
+
+    def _bucket_key(self, magnitude):
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _bucket_value(self, key):
+        # Midpoint (in relative terms) of the bucket (gamma^(key-1), gamma^key]
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def _add_to_sketch(self, value, n):
+        if value > 0:
+            key = self._bucket_key(value)
+            self._positive[key] = self._positive.get(key, 0) + n
+        elif value < 0:
+            key = self._bucket_key(-value)
+            self._negative[key] = self._negative.get(key, 0) + n
+        else:
+            self._zeros += n
+
+    def _to_sketch(self):
+        values, self._values = self._values, None
+        for value in values:
+            self._add_to_sketch(value, 1)
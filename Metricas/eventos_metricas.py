@@ -0,0 +1,148 @@
+import json
+import pandas as pd
+from procesar_metricas import METRICS, list_session_files, get_real_name
+from anonimizador import anonymize_many
+
+# "Metrica Apertura Flor" logs both openings and closings; closings get their own kind
+FLOWER_CLOSINGS = "flower_closings"
+EVENT_KINDS = list(METRICS.keys()) + [FLOWER_CLOSINGS]
+
+COUNT_KINDS = ["collider_entries", "sound_decrements", "flower_openings"]
+DURATION_KINDS = ["time_in_collider", "time_stationary", "time_flower_open"]
+
+_NAME_TO_KIND = {name: key for key, name in METRICS.items()}
+
+# First clock time of the line (event or interval start) and, for
+# "Inmovilidad: 9:40:28 | Movimiento: 9:40:30 | ..." lines, the second one (interval end)
+_TIMES_PATTERN = (r"(?P<h1>\d{1,2}):(?P<m1>\d{2}):(?P<s1>\d{2})"
+                  r"(?:[^|]*\|[^:|]*:\s*(?P<h2>\d{1,2}):(?P<m2>\d{2}):(?P<s2>\d{2}))?")
+_DURATION_PATTERN = r"Duracion: ([\d,.]+) segundos"
+
+def _collect_lines(filepath, rows):
+    """Append (session id, exercise id, kind, line, session start) for every non-empty metric line"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    sesion = data.get("sesion", {})
+    session_id = sesion.get("id")
+    inicio = sesion.get("inicio")
+
+    for exercise in data.get("ejercicios", []):
+        exercise_id = exercise.get("id")
+        for metric in exercise.get("metricas", []):
+            kind = _NAME_TO_KIND.get(metric.get("nombre", ""))
+            if kind is None:
+                continue
+            for line in metric.get("data", []):
+                if not line.strip():
+                    continue
+                line_kind = kind
+                if kind == "flower_openings" and "Flor abierta" not in line:
+                    line_kind = FLOWER_CLOSINGS
+                rows.append((session_id, exercise_id, line_kind, line, inicio))
+
+def _id_array(values):
+    """Nullable Int64 for numeric ids; ids of any other type (e.g. strings) keep their inferred dtype"""
+    if pd.api.types.infer_dtype(values, skipna=True) in ("integer", "empty"):
+        return pd.array(values, dtype="Int64")
+    return pd.array(values)
+
+def _anchor_clock_times(hours, minutes, seconds, session_start):
+    """
+    Turn wall-clock times (no date) into datetime64 values on the session's day.
+    Times more than 12 h before the session start are taken to be after midnight.
+    """
+    day = session_start.dt.normalize()
+    offset = pd.to_timedelta(hours * 3600 + minutes * 60 + seconds, unit="s")
+    timestamps = day + offset
+    rolled = timestamps < session_start - pd.Timedelta(hours=12)
+    return timestamps.where(~rolled, timestamps + pd.Timedelta(days=1))
+
+def _parse_rows(rows):
+    """Parse all collected lines at once into the typed event table"""
+    columns = ["session_id", "exercise_id", "kind", "line", "session_start"]
+    raw = pd.DataFrame.from_records(rows, columns=columns)
+    lines = raw["line"].astype(str)
+    session_start = pd.to_datetime(raw["session_start"])
+
+    times = lines.str.extract(_TIMES_PATTERN).astype("float64")
+    start = _anchor_clock_times(times["h1"], times["m1"], times["s1"], session_start)
+    end = _anchor_clock_times(times["h2"], times["m2"], times["s2"], session_start)
+    # Point events (collider entries, sound decrements, flower openings) end where they start
+    end = end.fillna(start)
+    # An interval that crosses midnight ends on the next day
+    end = end.where(~(end < start), end + pd.Timedelta(days=1))
+
+    duration = pd.to_numeric(
+        lines.str.extract(_DURATION_PATTERN, expand=False).str.replace(",", ".", regex=False),
+        errors="coerce"
+    )
+
+    return pd.DataFrame({
+        "session_id": _id_array(raw["session_id"]),
+        "exercise_id": _id_array(raw["exercise_id"]),
+        "kind": pd.Categorical(raw["kind"], categories=EVENT_KINDS),
+        "start": start.astype("datetime64[ns]"),
+        "end": end.astype("datetime64[ns]"),
+        "duration": duration.astype("float64"),
+    })
+
+def extract_session_events(filepath):
+    """
+    Event table for one session export.
+    One row per non-empty metric line: session_id, exercise_id, kind (categorical),
+    start/end (datetime64 anchored to sesion.inicio) and duration in seconds
+    (the logged "Duracion", NaN for point events).
+    """
+    rows = []
+    _collect_lines(filepath, rows)
+    return _parse_rows(rows)
+
+def build_event_table(session_files=None):
+    """
+    Event table for every session file, with categorical participant (alias)
+    and phase columns. All lines are parsed in a single vectorized pass.
+    """
+    if session_files is None:
+        session_files = list_session_files()
+
+    persons = anonymize_many(get_real_name(filename) for _, filename, _ in session_files)
+
+    rows = []
+    participants = []
+    phases = []
+    for (phase, _, filepath), person in zip(session_files, persons):
+        before = len(rows)
+        _collect_lines(filepath, rows)
+        participants.extend([person] * (len(rows) - before))
+        phases.extend([phase] * (len(rows) - before))
+
+    events = _parse_rows(rows)
+    events.insert(0, "phase", pd.Categorical(phases, categories=sorted(set(p for p, _, _ in session_files))))
+    events.insert(0, "participant", pd.Categorical(participants))
+    return events
+
+def summarize_events(events):
+    """
+    Reduce an event table to the same person_results structure as process_all_files:
+    {participant: {phase: summary}}. Counts are rows per kind, times are summed durations.
+    Sessions without any logged line have no rows, so they don't appear in the result.
+    """
+    # One reduction for every (participant, phase, kind), then one column per kind
+    totals = (events.groupby(["participant", "phase", "kind"], observed=True)["duration"]
+              .agg(["size", "sum"])
+              .unstack("kind", fill_value=0))
+    table = pd.concat([
+        totals["size"].reindex(columns=COUNT_KINDS, fill_value=0).astype(int),
+        totals["sum"].reindex(columns=DURATION_KINDS, fill_value=0.0).astype(float),
+    ], axis=1)
+    table.columns = COUNT_KINDS + DURATION_KINDS
+
+    person_results = {}
+    for (participant, phase), summary in table.to_dict("index").items():
+        person_results.setdefault(participant, {})[phase] = summary
+    return person_results
+
+def events_in_window(events, start, end):
+    """Events that start within [start, end), e.g. for time-of-day queries across sessions"""
+    mask = (events["start"] >= pd.Timestamp(start)) & (events["start"] < pd.Timestamp(end))
+    return events[mask]
@@ -1,7 +1,9 @@
 import os
+import argparse
 import matplotlib.pyplot as plt
 import numpy as np
 from procesar_metricas import process_all_files, METRICS
+from render_paralelo import run_cached_render_jobs
 
 def ensure_output_dir():
     output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'graficos_grupo')
@@ -30,13 +32,16 @@ def get_grouped_data(person_results, metric_key):
             values[phase].append(val)
     return participants, phases, values
 
-def plot_grouped_bar_chart(participants, phases, values, metric_name, metric_key, output_dir):
+def group_chart_filename(metric_key):
+    safe_metric_name = metric_key.replace(' ', '_')
+    return f'{safe_metric_name}_grupo.png'
+
+def draw_grouped_bars(ax, participants, phases, values, metric_name):
+    """Draw one metric's grouped bars (one bar per phase and participant) on an existing axis"""
     x = np.arange(len(participants))
     width = 0.8 / len(phases)  # total width for all bars per group
     colors = plt.colormaps['tab10']
 
-    fig, ax = plt.subplots(figsize=(max(8, len(participants)*1.2), 6))
-
     for i, phase in enumerate(phases):
         bar = ax.bar(x + i*width - (width*(len(phases)-1)/2), values[phase], width,
                      label=phase, color=colors(i))
@@ -55,24 +60,58 @@ def plot_grouped_bar_chart(participants, phases, values, metric_name, metric_key
     #ax.grid(axis='y', alpha=0.3, linestyle='--')
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
+
+def grouped_bar_figsize(participants):
+    return (max(8, len(participants)*1.2), 6)
+
+def save_grouped_bar_chart(participants, phases, values, metric_name, target):
+    """Render one metric's grouped bar chart and save it to target (a file path or a binary buffer)"""
+    fig, ax = plt.subplots(figsize=grouped_bar_figsize(participants))
+    draw_grouped_bars(ax, participants, phases, values, metric_name)
     plt.tight_layout()
+    plt.savefig(target, format='png', bbox_inches='tight', dpi=300)
+    plt.close(fig)
 
+def plot_grouped_bar_chart(participants, phases, values, metric_name, metric_key, output_dir):
     # Save figure
-    safe_metric_name = metric_key.replace(' ', '_')
-    filename = f'{safe_metric_name}_grupo.png'
+    filename = group_chart_filename(metric_key)
     filepath = os.path.join(output_dir, filename)
-    plt.savefig(filepath, bbox_inches='tight', dpi=300)
-    plt.close(fig)
+    save_grouped_bar_chart(participants, phases, values, metric_name, filepath)
     #print(f'Gráfico guardado: {filepath}')
 
-def main():
-    print('Generando gráficos de barras agrupadas por participante...')
+def generate_group_graphs(person_results=None, workers=1, force=False):
+    """
+    Generate one grouped bar chart per metric. person_results defaults to processing all files.
+    With workers > 1 the charts are drawn in parallel (same files as the serial path).
+    Charts whose data did not change since the last run are skipped unless force is set.
+    """
     output_dir = ensure_output_dir()
-    person_results = process_all_files()
+    if person_results is None:
+        person_results = process_all_files()
+    jobs = []
+    filenames = []
     for metric_key, metric_name in METRICS.items():
         participants, phases, values = get_grouped_data(person_results, metric_key)
-        plot_grouped_bar_chart(participants, phases, values, metric_name, metric_key, output_dir)
+        jobs.append((participants, phases, values, metric_name, metric_key, output_dir))
+        filenames.append(group_chart_filename(metric_key))
+    rendered, skipped = run_cached_render_jobs(plot_grouped_bar_chart, jobs, filenames, output_dir,
+                                               workers=workers, force=force)
+    print(f'Graficos de grupo: {rendered} generados, {skipped} sin cambios')
+    return output_dir
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera los graficos de barras agrupadas por metrica.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Cantidad de procesos para dibujar los graficos en paralelo (default: 1)")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Vuelve a dibujar todos los graficos aunque sus datos no hayan cambiado")
+    return parser.parse_args()
+
+def main(workers=1, force=False):
+    print('Generando gráficos de barras agrupadas por participante...')
+    output_dir = generate_group_graphs(workers=workers, force=force)
     print(f'¡Todos los gráficos han sido generados en {output_dir}!')
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    main(workers=args.workers, force=args.forzar)
@@ -1,19 +1,55 @@
 import os
+import io
+import sys
+import math
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageDraw
 
-
-def compose_grid(image_paths, output_path, rows=3, cols=2, padding=20, background_color=(255, 255, 255)):
+# Metricas/ (graficos_grupo.py, procesar_metricas.py) for the in-memory modes
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Reading order of the group charts in the composite
+ORDERED_METRICS = [
+    "flower_openings",
+    "time_flower_open",
+    "collider_entries",
+    "time_in_collider",
+    "sound_decrements",
+    "time_stationary",
+]
+
+
+def auto_grid(n_tiles, rows=None, cols=None):
+    """Pick a rows x cols layout for n_tiles (portrait-ish: 6 tiles -> 3 x 2) unless given."""
+    if n_tiles < 1:
+        raise ValueError("At least one image is required")
+    if cols is None and rows is None:
+        cols = max(1, math.isqrt(n_tiles))
+    if cols is None:
+        cols = math.ceil(n_tiles / rows)
+    if rows is None:
+        rows = math.ceil(n_tiles / cols)
+    if n_tiles > rows * cols:
+        raise ValueError(f"Expected at most {rows*cols} images, got {n_tiles}")
+    return rows, cols
+
+
+def compose_grid(image_paths, output_path, rows=None, cols=None, padding=20, background_color=(255, 255, 255)):
     """Compose images into a rows x cols grid and save as a single PNG.
 
-    - image_paths: list of absolute file paths in reading order (row-major)
+    - image_paths: list of images in reading order (row-major): file paths, binary
+      buffers (e.g. io.BytesIO with a PNG) or already opened PIL images
     - output_path: absolute path to save the composed PNG
+    - rows, cols: grid layout; missing values are derived from the number of images
+      (unused cells stay empty)
     - padding: pixels between tiles and around the border
     - background_color: RGB background color
     """
-    if len(image_paths) != rows * cols:
-        raise ValueError(f"Expected {rows*cols} images, got {len(image_paths)}")
+    rows, cols = auto_grid(len(image_paths), rows, cols)
 
-    images = [Image.open(p).convert("RGB") for p in image_paths]
+    images = [(p if isinstance(p, Image.Image) else Image.open(p)).convert("RGB") for p in image_paths]
 
     # Choose a common tile size. To avoid upscaling (which reduces quality),
     # use the minimum width/height across images.
@@ -30,15 +66,21 @@ def compose_grid(image_paths, output_path, rows=3, cols=2, padding=20, backgroun
     canvas = Image.new("RGB", (canvas_width, canvas_height), color=background_color)
 
     # Paste images row-major
-    idx = 0
-    for r in range(rows):
-        for c in range(cols):
-            x = padding + c * (tile_size[0] + padding)
-            y = padding + r * (tile_size[1] + padding)
-            canvas.paste(resized[idx], (x, y))
-            idx += 1
-
-    # Draw divider lines centered in the gaps between tiles
+    for idx, tile in enumerate(resized):
+        r, c = divmod(idx, cols)
+        x = padding + c * (tile_size[0] + padding)
+        y = padding + r * (tile_size[1] + padding)
+        canvas.paste(tile, (x, y))
+
+    _draw_separators(canvas, rows, cols, tile_size, padding)
+
+    # Overwrite if exists; PNG doesn't meaningfully use DPI, but the pixel size stays high.
+    canvas.save(output_path, format="PNG", optimize=True)
+
+
+def _draw_separators(canvas, rows, cols, tile_size, padding):
+    """Draw divider lines centered in the gaps between tiles"""
+    canvas_width, canvas_height = canvas.size
     draw = ImageDraw.Draw(canvas)
     line_color = (200, 200, 200)
     line_width = 4
@@ -53,22 +95,141 @@ def compose_grid(image_paths, output_path, rows=3, cols=2, padding=20, backgroun
         y_sep = padding + r * tile_size[1] + (r * padding) - padding // 2
         draw.line([(padding, y_sep), (canvas_width - padding, y_sep)], fill=line_color, width=line_width)
 
-    # Overwrite if exists; PNG doesn't meaningfully use DPI, but the pixel size stays high.
+
+def _load_tile(source, tile_size):
+    """Open one image and downscale it to tile_size as cheaply as possible."""
+    with Image.open(source) as img:
+        # JPEG can decode straight at a smaller scale; a no-op for other formats
+        img.draft("RGB", tile_size)
+        # Integer box reduction first, then a single LANCZOS pass for the remainder
+        factor = min(img.width // tile_size[0], img.height // tile_size[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+        tile = img.convert("RGB")
+    if tile.size != tile_size:
+        tile = tile.resize(tile_size, Image.LANCZOS)
+    return tile
+
+
+def compose_grid_streaming(image_paths, output_path, rows=None, cols=None, padding=20,
+                           background_color=(255, 255, 255), tile_size=None, workers=4):
+    """Same grid as compose_grid, but holding about one tile per worker plus the canvas in memory.
+
+    - image_paths: file paths or binary buffers, in reading order (row-major)
+    - tile_size: (width, height) of every tile; by default the smallest image size
+      (read from the headers only, without decoding the images)
+    - workers: threads that decode and resize tiles; at most this many tiles are in flight
+    """
+    rows, cols = auto_grid(len(image_paths), rows, cols)
+
+    if tile_size is None:
+        sizes = []
+        for source in image_paths:
+            with Image.open(source) as img:
+                sizes.append(img.size)
+            if hasattr(source, "seek"):
+                source.seek(0)
+        tile_size = (min(w for w, _ in sizes), min(h for _, h in sizes))
+
+    canvas_width = padding + cols * tile_size[0] + (cols - 1) * padding + padding
+    canvas_height = padding + rows * tile_size[1] + (rows - 1) * padding + padding
+    canvas = Image.new("RGB", (canvas_width, canvas_height), color=background_color)
+
+    def paste(idx, tile):
+        r, c = divmod(idx, cols)
+        canvas.paste(tile, (padding + c * (tile_size[0] + padding), padding + r * (tile_size[1] + padding)))
+        tile.close()
+
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for idx, source in enumerate(image_paths):
+            in_flight.append((idx, executor.submit(_load_tile, source, tile_size)))
+            if len(in_flight) >= workers:
+                done_idx, future = in_flight.popleft()
+                paste(done_idx, future.result())
+        while in_flight:
+            done_idx, future = in_flight.popleft()
+            paste(done_idx, future.result())
+
+    _draw_separators(canvas, rows, cols, tile_size, padding)
     canvas.save(output_path, format="PNG", optimize=True)
 
 
-def main():
+def render_group_chart_buffers(person_results, metric_keys=ORDERED_METRICS):
+    """Render the group charts straight into in-memory PNG buffers (same look as the *_grupo.png files)."""
+    from procesar_metricas import METRICS
+    from graficos_grupo import get_grouped_data, save_grouped_bar_chart
+
+    buffers = []
+    for metric_key in metric_keys:
+        participants, phases, values = get_grouped_data(person_results, metric_key)
+        buffer = io.BytesIO()
+        save_grouped_bar_chart(participants, phases, values, METRICS[metric_key], buffer)
+        buffer.seek(0)
+        buffers.append(buffer)
+    return buffers
+
+
+def plot_composite(person_results, output_path, metric_keys=ORDERED_METRICS, rows=None, cols=None, dpi=300):
+    """Draw every group chart as a subplot of a single matplotlib figure and save it as output_path."""
+    import matplotlib.pyplot as plt
+    from procesar_metricas import METRICS
+    from graficos_grupo import get_grouped_data, draw_grouped_bars, grouped_bar_figsize
+
+    rows, cols = auto_grid(len(metric_keys), rows, cols)
+    tile_width, tile_height = grouped_bar_figsize(sorted(person_results.keys()))
+    fig, axes = plt.subplots(rows, cols, figsize=(tile_width * cols, tile_height * rows), squeeze=False)
+
+    for idx, ax in enumerate(axes.flat):
+        if idx >= len(metric_keys):
+            ax.set_visible(False)
+            continue
+        metric_key = metric_keys[idx]
+        participants, phases, values = get_grouped_data(person_results, metric_key)
+        draw_grouped_bars(ax, participants, phases, values, METRICS[metric_key])
+
+    fig.tight_layout(h_pad=3, w_pad=3)
+    fig.savefig(output_path, bbox_inches='tight', dpi=dpi)
+    plt.close(fig)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Combina los graficos de grupo en all_together.png.")
+    parser.add_argument("--modo", choices=["archivos", "memoria", "figura"], default="archivos",
+                        help="archivos: combina los *_grupo.png ya guardados; "
+                             "memoria: dibuja los graficos en buffers y los combina sin pasar por disco; "
+                             "figura: una sola figura de matplotlib con subplots (default: archivos)")
+    parser.add_argument("--acotado", action="store_true",
+                        help="En modo archivos, combina de a una imagen por hilo (memoria acotada, para grillas grandes)")
+    return parser.parse_args()
+
+
+def compose_from_results(person_results, output_path, mode="figura", metric_keys=ORDERED_METRICS):
+    """Build the composite from person_results, without reading the *_grupo.png files."""
+    if mode == "figura":
+        plot_composite(person_results, output_path, metric_keys)
+    elif mode == "memoria":
+        compose_grid(render_group_chart_buffers(person_results, metric_keys), output_path,
+                     padding=30, background_color=(255, 255, 255))
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+
+
+def main(mode="archivos", person_results=None, bounded=False):
     script_dir = os.path.dirname(os.path.abspath(__file__))
+    output_path = os.path.join(script_dir, "all_together.png")
+
+    if mode != "archivos":
+        if person_results is None:
+            from procesar_metricas import process_all_files
+            person_results = process_all_files()
+        compose_from_results(person_results, output_path, mode)
+        print(f"Imagen combinada guardada en: {output_path}")
+        return
 
     # Explicit list (avoids picking up all_together.png on subsequent runs)
-    ordered_files = [
-        "flower_openings_grupo.png",
-        "time_flower_open_grupo.png",
-        "collider_entries_grupo.png",
-        "time_in_collider_grupo.png",
-        "sound_decrements_grupo.png",
-        "time_stationary_grupo.png",
-    ]
+    ordered_files = [f"{metric_key}_grupo.png" for metric_key in ORDERED_METRICS]
 
     image_paths = [os.path.join(script_dir, name) for name in ordered_files]
     missing = [p for p in image_paths if not os.path.isfile(p)]
@@ -76,13 +237,11 @@ def main():
         missing_names = ", ".join(os.path.basename(p) for p in missing)
         raise FileNotFoundError(f"Missing input images: {missing_names}")
 
-    output_path = os.path.join(script_dir, "all_together.png")
-
-    compose_grid(image_paths, output_path, rows=3, cols=2, padding=30, background_color=(255, 255, 255))
+    compose = compose_grid_streaming if bounded else compose_grid
+    compose(image_paths, output_path, rows=3, cols=2, padding=30, background_color=(255, 255, 255))
     print(f"Imagen combinada guardada en: {output_path}")
 
 
 if __name__ == "__main__":
-    main()
-
-
+    args = parse_args()
+    main(mode=args.modo, bounded=args.acotado)
@@ -1,6 +1,8 @@
 import os
+import argparse
 import matplotlib.pyplot as plt
 from procesar_metricas import process_all_files
+from render_paralelo import run_cached_render_jobs
 
 # Labels for plotting
 METRIC_LABELS = {
@@ -18,6 +20,10 @@ def ensure_output_dir():
     os.makedirs(output_dir, exist_ok=True)
     return output_dir
 
+def person_chart_filename(person):
+    safe_person_name = person.replace(' ', '_')
+    return f'{safe_person_name}_individual.png'
+
 def plot_person_comparison(person, phases, output_dir):
     """Generate a comparison chart for one person's metrics between phases"""
     metrics = [
@@ -55,7 +61,7 @@ def plot_person_comparison(person, phases, output_dir):
     ax.set_xticklabels(labels, rotation=20, ha='right')
     ax.set_xlabel("Metricas", fontweight='bold', labelpad=10)
     ax.set_ylabel("Valor", fontweight='bold', labelpad=15)
-    ax.set_title(f"Comparacion de metricas: {person.capitalize()}", fontweight='bold')
+    ax.set_title(f"Comparacion de metricas: {person}", fontweight='bold')
     ax.legend()
     #ax.grid(axis='y', alpha=0.3)
     ax.spines['top'].set_visible(False)
@@ -63,35 +69,50 @@ def plot_person_comparison(person, phases, output_dir):
     plt.tight_layout()
     
     # Save figure
-    safe_person_name = person.replace(' ', '_')
-    filename = f'{safe_person_name}_individual.png'
+    filename = person_chart_filename(person)
     filepath = os.path.join(output_dir, filename)
     plt.savefig(filepath, bbox_inches='tight', dpi=300)
     plt.close(fig)
     #print(f'Grafico guardado: {filepath}')
 
-def generate_all_graphs():
-    """Generate comparison graphs for all persons"""
+def generate_all_graphs(person_results=None, workers=1, force=False):
+    """
+    Generate comparison graphs for all persons. person_results defaults to processing all files.
+    With workers > 1 the charts are drawn in parallel (same files as the serial path).
+    Charts whose data did not change since the last run are skipped unless force is set.
+    """
     # Import data from the processing script
-    person_results = process_all_files()
+    if person_results is None:
+        person_results = process_all_files()
     
     print("Generando graficos individuales...")
     
     # Create output directory
     output_dir = ensure_output_dir()
     
-    for person, phases in person_results.items():
-        #print(f"Generando grafico para: {person.capitalize()}")
-        plot_person_comparison(person, phases, output_dir)
+    jobs = [(person, dict(phases), output_dir) for person, phases in person_results.items()]
+    filenames = [person_chart_filename(person) for person in person_results]
+    rendered, skipped = run_cached_render_jobs(plot_person_comparison, jobs, filenames, output_dir,
+                                               workers=workers, force=force)
+    print(f"Graficos individuales: {rendered} generados, {skipped} sin cambios")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera un grafico comparativo por participante.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Cantidad de procesos para dibujar los graficos en paralelo (default: 1)")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Vuelve a dibujar todos los graficos aunque sus datos no hayan cambiado")
+    return parser.parse_args()
 
-def main():
+def main(workers=1, force=False):
     """Main function to generate all individual graphs"""
     try:
-        generate_all_graphs()
+        generate_all_graphs(workers=workers, force=force)
         output_dir = ensure_output_dir()
         print(f"¡Todos los graficos han sido generados en {output_dir}!")
     except Exception as e:
         print(f"Error al generar los graficos: {e}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    main(workers=args.workers, force=args.forzar) 
\ No newline at end of file
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import argparse
+from procesar_metricas import process_all_files, save_to_csv, save_columnar_store, print_summary
+from anonimizador import save_mapping
+import analisis_descriptivo
+import comparacion_fases
+import graficos_grupo
+import graficos_individuales
+
+# all_together.py lives next to the charts it composes
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, "graficos_grupo"))
+import all_together
+
+STAGES = ["analisis", "comparacion", "grupo", "individuales", "compuesto"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Procesa las sesiones una sola vez y genera el analisis descriptivo y los graficos. "
+                    "Sin flags de etapa se ejecutan todas.")
+    parser.add_argument("--analisis", action="store_true", help="Analisis descriptivo (analisis_descriptivo.csv)")
+    parser.add_argument("--comparacion", action="store_true",
+                        help="Comparacion pareada entre fases (comparacion_fases.csv)")
+    parser.add_argument("--grupo", action="store_true", help="Graficos de barras por metrica (graficos_grupo/)")
+    parser.add_argument("--individuales", action="store_true", help="Graficos por participante (graficos_individuales/)")
+    parser.add_argument("--compuesto", action="store_true", help="Imagen combinada all_together.png")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Cantidad de procesos para leer los archivos y dibujar los graficos en paralelo (default: 1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignora la cache y vuelve a leer todos los archivos")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Lee cada JSON de forma incremental, con memoria acotada")
+    parser.add_argument("--desde-almacen", action="store_true",
+                        help="Carga los datos del almacen Feather en lugar de leer los JSON")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Vuelve a dibujar todos los graficos aunque sus datos no hayan cambiado")
+    return parser.parse_args()
+
+def run_pipeline(stages=None, workers=1, use_cache=True, streaming=False, from_store=False, force=False):
+    """
+    Ingest the sessions once and fan the same person_results out to every selected stage.
+    stages: subset of STAGES (default: all). Returns the seconds spent per step.
+    """
+    if not stages:
+        stages = STAGES
+    timings = {}
+
+    start = time.perf_counter()
+    if from_store:
+        from almacen_metricas import load_person_results
+        person_results = load_person_results()
+    else:
+        person_results = process_all_files(workers=workers, use_cache=use_cache, streaming=streaming)
+        print_summary(person_results)
+        save_to_csv(person_results)
+        save_columnar_store(person_results)
+        save_mapping()
+    timings["ingesta"] = time.perf_counter() - start
+
+    if "analisis" in stages:
+        start = time.perf_counter()
+        analysis_results = analisis_descriptivo.generate_descriptive_analysis(person_results)
+        analisis_descriptivo.print_summary_table(analysis_results)
+        analisis_descriptivo.save_to_csv(analysis_results)
+        timings["analisis"] = time.perf_counter() - start
+
+    if "comparacion" in stages:
+        start = time.perf_counter()
+        comparison_results = comparacion_fases.compare_phases(person_results, workers=workers)
+        comparacion_fases.print_summary_table(comparison_results)
+        comparacion_fases.save_to_csv(comparison_results)
+        timings["comparacion"] = time.perf_counter() - start
+
+    if "grupo" in stages:
+        start = time.perf_counter()
+        output_dir = graficos_grupo.generate_group_graphs(person_results, workers=workers, force=force)
+        print(f"Graficos de grupo generados en {output_dir}")
+        timings["grupo"] = time.perf_counter() - start
+
+    if "individuales" in stages:
+        start = time.perf_counter()
+        graficos_individuales.generate_all_graphs(person_results, workers=workers, force=force)
+        print(f"Graficos individuales generados en {graficos_individuales.ensure_output_dir()}")
+        timings["individuales"] = time.perf_counter() - start
+
+    if "compuesto" in stages:
+        start = time.perf_counter()
+        # Drawn straight from person_results, without re-reading the *_grupo.png files
+        all_together.main(mode="figura", person_results=person_results)
+        timings["compuesto"] = time.perf_counter() - start
+
+    return timings
+
+def main():
+    args = parse_args()
+    stages = [stage for stage in STAGES if getattr(args, stage)]
+    timings = run_pipeline(stages, workers=args.workers, use_cache=not args.no_cache,
+                           streaming=args.streaming, from_store=args.desde_almacen, force=args.forzar)
+
+    print("\nTiempos por etapa:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<13} {seconds:6.2f}s")
+    print(f"  {'total':<13} {sum(timings.values()):6.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,15 @@ import csv
 import json
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import argparse
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from anonimizador import anonymize_name, save_mapping
+from anonimizador import anonymize_many, save_mapping
+import cache_metricas
+from streaming_metricas import iter_metric_lines
 
 # Directories to process
 # Get the directory where this script is located
@@ -22,16 +27,47 @@ METRICS = {
     "time_flower_open": "Metrica Duracion Flor Abierta"
 }
 
-def parse_seconds_from_string(s):
-    match = re.search(r"Duracion: ([\d,.]+) segundos", s)
-    if match:
-        return float(match.group(1).replace(",", "."))
-    return 0.0
+# Separator used to join a metric's lines into one buffer. After each match the
+# pattern consumes the rest of the line, so only the first duration of every
+# line counts, like re.search per line.
+_LINE_SEP = "\x1e"
+_BULK_DURATION_PATTERN = re.compile(r"Duracion: ([\d.]+) segundos[^" + _LINE_SEP + r"]*")
 
-def process_file(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    summary = {
+def sum_durations(values):
+    """
+    Sum the "Duracion: X,Y segundos" of a whole list of lines in one regex pass.
+    Lines without a duration count as 0.
+    """
+    # Comma decimals -> dot decimals for the whole buffer at once
+    buffer = _LINE_SEP.join(values).replace(",", ".")
+    return sum(map(float, _BULK_DURATION_PATTERN.findall(buffer)), 0.0)
+
+def count_non_empty(values):
+    """Count non-empty values"""
+    return sum(1 for v in values if v.strip())
+
+def count_containing_text(values, text):
+    """Count values containing specific text"""
+    return sum(1 for v in values if text in v)
+
+def count_flower_openings(values):
+    return count_containing_text(values, "Flor abierta")
+
+# Metric name in the JSON -> (summary key, handler over a list of data lines)
+metric_handlers = {
+    METRICS["collider_entries"]: ("collider_entries", count_non_empty),
+    METRICS["sound_decrements"]: ("sound_decrements", count_non_empty),
+    METRICS["flower_openings"]: ("flower_openings", count_flower_openings),
+    METRICS["time_in_collider"]: ("time_in_collider", sum_durations),
+    METRICS["time_stationary"]: ("time_stationary", sum_durations),
+    METRICS["time_flower_open"]: ("time_flower_open", sum_durations)
+}
+
+# Lines buffered per handler call in streaming mode
+STREAM_BATCH_SIZE = 4096
+
+def empty_summary():
+    return {
         "collider_entries": 0,
         "sound_decrements": 0,
         "flower_openings": 0,
@@ -39,27 +75,19 @@ def process_file(filepath):
         "time_stationary": 0.0,
         "time_flower_open": 0.0
     }
+
+def process_file(filepath, streaming=False):
+    """
+    Summarize one session export.
+    With streaming, the file is read incrementally and never loaded as a whole,
+    so memory stays flat regardless of the file size.
+    """
+    if streaming:
+        return process_file_streaming(filepath)
     
-    def count_non_empty(values):
-        """Count non-empty values"""
-        return sum(1 for v in values if v.strip())
-    
-    def count_containing_text(values, text):
-        """Count values containing specific text"""
-        return sum(1 for v in values if text in v)
-    
-    def sum_parsed_times(values):
-        """Sum time durations from metric strings"""
-        return sum(parse_seconds_from_string(v) for v in values if v.strip())
-    
-    metric_handlers = {
-        METRICS["collider_entries"]: ("collider_entries", count_non_empty),
-        METRICS["sound_decrements"]: ("sound_decrements", count_non_empty),
-        METRICS["flower_openings"]: ("flower_openings", lambda values: count_containing_text(values, "Flor abierta")),
-        METRICS["time_in_collider"]: ("time_in_collider", sum_parsed_times),
-        METRICS["time_stationary"]: ("time_stationary", sum_parsed_times),
-        METRICS["time_flower_open"]: ("time_flower_open", sum_parsed_times)
-    }
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    summary = empty_summary()
     
     exercises = data.get("ejercicios", [])
     for exercise in exercises:
@@ -74,24 +102,92 @@ def process_file(filepath):
     
     return summary
 
-def get_person_name(filename):
-    # Extracts the name from the filename, e.g., Hugo_1.json -> hugo
-    real_name = filename.split('_')[0].upper()
-    return anonymize_name(real_name)
-
-def process_all_files():
-    """Process all JSON files and return results organized by person and phase"""
-    # person_results[person][phase] = summary
-    person_results = defaultdict(dict)
+def process_file_streaming(filepath):
+    """Same summary as process_file, fed line by line from the streaming parser in bounded batches"""
+    summary = empty_summary()
+    batch_name = None
+    batch = []
+    
+    def flush():
+        if batch_name in metric_handlers and batch:
+            key, handler = metric_handlers[batch_name]
+            summary[key] += handler(batch)
+    
+    for name, line in iter_metric_lines(filepath):
+        if name != batch_name or len(batch) >= STREAM_BATCH_SIZE:
+            flush()
+            batch_name = name
+            batch = []
+        batch.append(line)
+    flush()
     
+    return summary
+
+def get_real_name(filename):
+    # Extracts the name from the filename, e.g., Hugo_1.json -> HUGO
+    return filename.split('_')[0].upper()
+
+def list_session_files():
+    """
+    List the JSON session files of every phase in a stable order.
+    Returns a list of (phase, filename, filepath) tuples sorted by phase and filename,
+    so aliases are handed out in the same order on every run.
+    """
+    session_files = []
     for idx, directory in enumerate(directories, 1):
         phase = f"Fase{idx}"
-        for filename in os.listdir(directory):
+        for filename in sorted(os.listdir(directory)):
             if filename.endswith('.json'):
-                person = get_person_name(filename)
-                filepath = os.path.join(directory, filename)
-                summary = process_file(filepath)
-                person_results[person][phase] = summary
+                session_files.append((phase, filename, os.path.join(directory, filename)))
+    return session_files
+
+def process_all_files(workers=1, use_cache=True, streaming=False):
+    """
+    Process all JSON files and return results organized by person and phase.
+    With workers > 1 the files are parsed in a process pool; aliases are still
+    assigned here, in file order, so the output matches the serial path.
+    With use_cache, summaries of unchanged files are read from the on-disk cache
+    and only new or modified files are parsed.
+    With streaming, files are parsed incrementally (see process_file).
+    """
+    # person_results[person][phase] = summary
+    person_results = defaultdict(dict)
+    
+    session_files = list_session_files()
+    # Resolve aliases in this process, in one batch: the anonymizer keeps a global counter
+    persons = anonymize_many(get_real_name(filename) for _, filename, _ in session_files)
+    filepaths = [filepath for _, _, filepath in session_files]
+    
+    summaries = [None] * len(filepaths)
+    digests = [None] * len(filepaths)
+    cache = cache_metricas.load_cache() if use_cache else None
+    if cache is not None:
+        for i, filepath in enumerate(filepaths):
+            summaries[i], digests[i] = cache_metricas.lookup(cache, filepath)
+    pending = [i for i, summary in enumerate(summaries) if summary is None]
+    pending_paths = [filepaths[i] for i in pending]
+    
+    parse = partial(process_file, streaming=streaming)
+    if workers and workers > 1 and len(pending_paths) > 1:
+        chunksize = max(1, len(pending_paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(parse, pending_paths, chunksize=chunksize))
+    else:
+        parsed = [parse(filepath) for filepath in pending_paths]
+    
+    for i, summary in zip(pending, parsed):
+        summaries[i] = summary
+    
+    if cache is not None:
+        for i, summary in zip(pending, parsed):
+            cache_metricas.store(cache, filepaths[i], summary, digests[i])
+        evicted = cache_metricas.evict_missing(cache, filepaths)
+        cache_metricas.save_cache(cache)
+        print(f"Cache de metricas: {len(filepaths) - len(pending)} reutilizados, "
+              f"{len(pending)} procesados, {evicted} eliminados")
+    
+    for (phase, _, _), person, summary in zip(session_files, persons, summaries):
+        person_results[person][phase] = summary
     
     return person_results
 
@@ -122,7 +218,7 @@ def save_to_csv(person_results, filename="datos_procesados.csv"):
                 if phase in phases:
                     summary = phases[phase]
                     row = {
-                        "Participante": person.capitalize(),
+                        "Participante": person,
                         "Fase": phase,
                         "Entradas_Collider": summary['collider_entries'],
                         "Decrementos_Sonido": summary['sound_decrements'],
@@ -135,10 +231,25 @@ def save_to_csv(person_results, filename="datos_procesados.csv"):
     
     print(f"Datos procesados guardados en: {filepath}")
 
+def save_columnar_store(person_results):
+    """
+    Save the results in the columnar store (see almacen_metricas).
+    Skipped with a notice when pandas/pyarrow are not installed.
+    """
+    try:
+        from almacen_metricas import save_columnar
+    except ImportError as e:
+        print(f"No se guardo el almacen columnar (falta dependencia: {e.name})")
+        return
+    try:
+        save_columnar(person_results)
+    except ImportError as e:
+        print(f"No se guardo el almacen columnar (falta dependencia: {e.name})")
+
 def print_summary(person_results):
     """Print a summary of results for each person"""
     for person, phases in person_results.items():
-        print(f"\nPersona: {person.capitalize()}")
+        print(f"\nPersona: {person}")
         for phase in ["Fase1", "Fase2"]:
             if phase in phases:
                 summary = phases[phase]
@@ -152,18 +263,32 @@ def print_summary(person_results):
             else:
                 print(f"  {phase}: No data")
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Procesa las metricas de las sesiones de Fase1 y Fase2.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Cantidad de procesos para leer los archivos en paralelo (default: 1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignora la cache y vuelve a leer todos los archivos")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Lee cada JSON de forma incremental, con memoria acotada (para archivos muy grandes)")
+    return parser.parse_args()
+
+def main(workers=1, use_cache=True, streaming=False):
     # Process all files
-    person_results = process_all_files()
+    person_results = process_all_files(workers=workers, use_cache=use_cache, streaming=streaming)
     
     # Print summary
     print_summary(person_results)
     
     # Save to CSV
     save_to_csv(person_results)
+    
+    # Columnar copy (Feather per phase) for fast, typed loading in other modules
+    save_columnar_store(person_results)
 
     # Guardar el mapa real → alias en la carpeta Metricas/
     save_mapping()
 
 if __name__ == "__main__":
-     main()
\ No newline at end of file
+    args = parse_args()
+    main(workers=args.workers, use_cache=not args.no_cache, streaming=args.streaming)
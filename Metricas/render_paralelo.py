@@ -0,0 +1,52 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache_graficos import figure_hash, is_fresh, load_manifest, save_manifest
+
+def _init_worker():
+    """Load matplotlib once per worker with the non-interactive Agg backend"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+def _render(job):
+    render_func, args = job
+    return render_func(*args)
+
+def run_render_jobs(render_func, jobs, workers=1):
+    """
+    Call render_func(*args) for every args tuple in jobs.
+    With workers > 1 the charts are drawn in a process pool whose workers keep
+    matplotlib loaded between charts. render_func must be a module-level function
+    and args a lightweight, picklable payload (lists/dicts of numbers and names).
+    Returns the results in job order.
+    """
+    jobs = list(jobs)
+    if workers and workers > 1 and len(jobs) > 1:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker) as executor:
+            return list(executor.map(_render, [(render_func, args) for args in jobs], chunksize=chunksize))
+    return [render_func(*args) for args in jobs]
+
+def run_cached_render_jobs(render_func, jobs, filenames, output_dir, workers=1, force=False):
+    """
+    Like run_render_jobs, but skips the charts whose data and style did not change
+    since the last run (see cache_graficos). The last element of every job must be output_dir.
+    filenames: the file each job writes inside output_dir.
+    Returns (rendered, skipped) counts.
+    """
+    manifest = load_manifest(output_dir)
+    pending = []
+    digests = {}
+    for args, filename in zip(jobs, filenames):
+        digest = figure_hash(render_func, list(args[:-1]))
+        if force or not is_fresh(manifest, output_dir, filename, digest):
+            pending.append(args)
+            digests[filename] = digest
+
+    run_render_jobs(render_func, pending, workers=workers)
+
+    manifest.update(digests)
+    save_manifest(output_dir, manifest)
+    return len(pending), len(filenames) - len(pending)
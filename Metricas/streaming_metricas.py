@@ -0,0 +1,157 @@
+import re
+import json
+
+# Size of each read from disk. Memory stays around this size plus the longest single string.
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[\s,:]*")
+# Body of a string up to its closing quote; stops early only at the end of the buffer
+# (or before a trailing backslash whose escaped character has not been read yet)
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_SCALAR = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+# Characters that would continue a number if the next chunk started with them
+_NUMBER_CONTINUATION = ".eE+-0123456789"
+
+# Path of the metric lines and names inside a session export (None = any array item)
+_DATA_PATH = ("ejercicios", None, "metricas", None, "data", None)
+_NAME_PATH = ("ejercicios", None, "metricas", None, "nombre")
+_METRIC_DEPTH = 4
+
+def iter_json_events(f, chunk_size=CHUNK_SIZE):
+    """
+    Tokenize a JSON document incrementally from a text file object.
+    Yields (event, value) tuples: ("start_map", None), ("end_map", None),
+    ("start_array", None), ("end_array", None), ("key", str) and ("value", scalar).
+    Only the current chunk is kept in memory, never the whole tree.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    # Stack of open containers: True for objects, False for arrays
+    stack = []
+    expect_key = False
+    # How far the string at pos was already scanned without finding its closing quote
+    scanned = 0
+    # Reads double while a token stays incomplete, so a long string is copied O(1) times per byte
+    read_size = chunk_size
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        string_end = None
+        if pos < len(buf) and buf[pos] == '"':
+            string_end, scanned = _string_end(buf, pos, scanned)
+            complete = string_end is not None
+        else:
+            complete = pos < len(buf) and _token_complete(buf, pos)
+        # Strings and scalars may be cut at the chunk boundary: read on until a full token is available
+        if not eof and not complete:
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+            elif pos < len(buf):
+                read_size *= 2
+            scanned = max(scanned - pos, 0)
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        if pos >= len(buf):
+            return
+        read_size = chunk_size
+
+        char = buf[pos]
+        if char == "{":
+            stack.append(True)
+            expect_key = True
+            pos += 1
+            yield "start_map", None
+        elif char == "[":
+            stack.append(False)
+            expect_key = False
+            pos += 1
+            yield "start_array", None
+        elif char in "}]":
+            stack.pop()
+            pos += 1
+            yield ("end_map" if char == "}" else "end_array"), None
+            expect_key = bool(stack) and stack[-1]
+        elif char == '"':
+            if string_end is None:
+                raise ValueError(f"Unterminated string near: {buf[pos:pos + 40]!r}")
+            text = json.loads(buf[pos:string_end])
+            pos = string_end
+            if expect_key:
+                expect_key = False
+                yield "key", text
+            else:
+                expect_key = bool(stack) and stack[-1]
+                yield "value", text
+        else:
+            match = _SCALAR.match(buf, pos)
+            if match is None:
+                raise ValueError(f"Invalid JSON near: {buf[pos:pos + 40]!r}")
+            pos = match.end()
+            expect_key = bool(stack) and stack[-1]
+            yield "value", json.loads(match.group())
+
+def _string_end(buf, pos, scanned):
+    """
+    End (index after the closing quote) of the string starting at pos, or None if it is not complete yet.
+    Scanning resumes at scanned, so each character of a long string is looked at only once.
+    Returns (end, scanned).
+    """
+    end = _STRING_BODY.match(buf, max(scanned, pos + 1)).end()
+    if end < len(buf) and buf[end] == '"':
+        return end + 1, end
+    return None, end
+
+def _token_complete(buf, pos):
+    """Check that the scalar starting at pos is followed by a delimiter, so the next chunk cannot extend it"""
+    if buf[pos] in "{}[]":
+        return True
+    match = _SCALAR.match(buf, pos)
+    return (match is not None and match.end() < len(buf)
+            and buf[match.end()] not in _NUMBER_CONTINUATION)
+
+def _matches(path, pattern):
+    return len(path) == len(pattern) and all(p is None or p == k for k, p in zip(path, pattern))
+
+def iter_metric_lines(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Stream the metric lines of a session export.
+    Yields (metric nombre, data line) pairs in file order without loading the JSON tree.
+    Lines that appear before their metric's "nombre" are held until it is known.
+    """
+    # path[i] is the key (objects) or None (arrays) of each open container
+    path = []
+    current_name = None
+    pending = []
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for event, value in iter_json_events(f, chunk_size):
+            if event == "key":
+                path[-1] = value
+            elif event in ("start_map", "start_array"):
+                if len(path) == _METRIC_DEPTH and _matches(tuple(path), _DATA_PATH[:_METRIC_DEPTH]) and event == "start_map":
+                    # A new metric object starts
+                    current_name = None
+                    pending = []
+                path.append(None)
+            elif event in ("end_map", "end_array"):
+                path.pop()
+                if len(path) == _METRIC_DEPTH and event == "end_map" and pending:
+                    # Metric without "nombre": same as metric.get("nombre", "")
+                    for line in pending:
+                        yield "", line
+                    pending = []
+            else:
+                current = tuple(path)
+                if _matches(current, _DATA_PATH) and isinstance(value, str):
+                    if current_name is None:
+                        pending.append(value)
+                    else:
+                        yield current_name, value
+                elif _matches(current, _NAME_PATH):
+                    current_name = value if isinstance(value, str) else ""
+                    for line in pending:
+                        yield current_name, line
+                    pending = []
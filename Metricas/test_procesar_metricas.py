@@ -0,0 +1,24 @@
+import csv
+from procesar_metricas import empty_summary, save_to_csv, print_summary
+import anonimizador
+
+def test_hmac_alias_reaches_output_unchanged(tmp_path, monkeypatch, capsys):
+    # Isolated alias state: nothing is read from or written to the real mapa_participantes.csv
+    monkeypatch.setattr(anonimizador, "ANONYMIZED_MAP", {})
+    monkeypatch.setattr(anonimizador, "_alias_owners", {})
+    monkeypatch.setattr(anonimizador, "_loaded", True)
+    monkeypatch.setattr(anonimizador, "SCHEME", anonimizador.SCHEME)
+    monkeypatch.setattr(anonimizador, "_secret", None)
+    anonimizador.use_hmac_pseudonyms(secret="clave de prueba")
+
+    alias = anonimizador.anonymize_name("Participante de prueba")
+    assert alias.startswith(anonimizador.HASH_PREFIX)
+
+    person_results = {alias: {"Fase1": empty_summary()}}
+    output = tmp_path / "datos_procesados.csv"
+    save_to_csv(person_results, filename=str(output))
+    with open(output, newline="", encoding="utf-8") as f:
+        assert [row["Participante"] for row in csv.DictReader(f)] == [alias]
+
+    print_summary(person_results)
+    assert f"Persona: {alias}\n" in capsys.readouterr().out
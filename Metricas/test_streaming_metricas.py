@@ -0,0 +1,62 @@
+import io
+import json
+import pytest
+from streaming_metricas import iter_json_events, iter_metric_lines
+from procesar_metricas import METRICS, list_session_files, process_file
+
+def build_from_events(events):
+    """Rebuild the Python object described by iter_json_events, to compare it with json.loads"""
+    stack = [[]]
+    keys = []
+    for event, value in events:
+        if event == "key":
+            keys.append(value)
+            continue
+        if event in ("start_map", "start_array"):
+            stack.append({} if event == "start_map" else [])
+            continue
+        if event in ("end_map", "end_array"):
+            value = stack.pop()
+        container = stack[-1]
+        if isinstance(container, dict):
+            container[keys.pop()] = value
+        else:
+            container.append(value)
+    return stack[0][0]
+
+def test_numbers_and_strings_cut_at_every_chunk_size():
+    doc = json.dumps({
+        "sesion": {"v": 12.5, "neg": -0.25, "exp": 1e-7, "big": 6.02E+23, "int": 1234567,
+                   "lista": [0, -3, 2.5e10, 3.0, True, False, None],
+                   "texto": 'escapes \\" \\\\ \\n y "comillas"', "largo": "x" * 300}
+    })
+    for chunk_size in range(1, len(doc) + 1):
+        events = iter_json_events(io.StringIO(doc), chunk_size=chunk_size)
+        assert build_from_events(events) == json.loads(doc), chunk_size
+
+def test_number_cut_after_decimal_point_at_chunk_boundary():
+    doc = '{"sesion": {"v": 12.5}}'
+    assert build_from_events(iter_json_events(io.StringIO(doc), chunk_size=20)) == json.loads(doc)
+
+@pytest.mark.parametrize("filepath", [path for _, _, path in list_session_files()])
+def test_streaming_summary_matches_json_load(filepath):
+    assert process_file(filepath, streaming=True) == process_file(filepath)
+
+def test_metric_lines_before_their_nombre_are_kept(tmp_path):
+    session = {"ejercicios": [{"metricas": [
+        {"data": ["9:40:01: Entrada", "9:41:02: Entrada"], "nombre": METRICS["collider_entries"]},
+        {"data": ["Inmovilidad: 9:40:28 | Movimiento: 9:40:30 | Duracion: 2,5 segundos"]},
+        {"nombre": METRICS["time_stationary"],
+         "data": ["Inmovilidad: 9:42:00 | Movimiento: 9:42:04 | Duracion: 4,0 segundos"]},
+    ]}]}
+    path = tmp_path / "Prueba_1.json"
+    path.write_text(json.dumps(session), encoding="utf-8")
+
+    for chunk_size in (1, 7, 64):
+        assert list(iter_metric_lines(path, chunk_size=chunk_size)) == [
+            (METRICS["collider_entries"], "9:40:01: Entrada"),
+            (METRICS["collider_entries"], "9:41:02: Entrada"),
+            ("", "Inmovilidad: 9:40:28 | Movimiento: 9:40:30 | Duracion: 2,5 segundos"),
+            (METRICS["time_stationary"], "Inmovilidad: 9:42:00 | Movimiento: 9:42:04 | Duracion: 4,0 segundos"),
+        ]
+    assert process_file(path, streaming=True) == process_file(path)
@@ -1,45 +1,360 @@
 import csv
 import os
 
+# json, sqlite3, secrets, hmac y hashlib se importan dentro de las funciones que los usan:
+# importar el modulo tiene que ser casi gratis para los scripts que solo leen el mapa
+
 ANONYMIZED_MAP = {}
 _counter = 1
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 mapping_file = os.path.join(script_dir, "mapa_participantes.csv")
+# Siguiente numero de alias, junto con el tamano y la fecha del CSV para el que es valido
+counter_file = os.path.join(script_dir, "mapa_participantes.contador.json")
+
+# El mapa se carga recien cuando se usa por primera vez (importar el modulo no lee archivos)
+_loaded = False
+
+# Backend de asignacion de alias:
+#   "csv"    -> mapa en memoria cargado del CSV (un solo proceso a la vez)
+#   "sqlite" -> base SQLite compartida: asigna alias de forma atomica entre procesos
+BACKEND = os.environ.get("ANONIMIZADOR_BACKEND", "csv").strip().lower()
+db_file = os.path.join(script_dir, "mapa_participantes.sqlite")
+_connection = None
+
+# Esquema de alias para nombres nuevos:
+#   "secuencial" -> Part1, Part2, ... en orden de aparicion
+#   "hmac"       -> PartH<hex>: HMAC-SHA256 del nombre normalizado con una clave local.
+#                   Cada proceso calcula el mismo alias por su cuenta, sin contador compartido.
+# Los nombres que ya estan en mapping_file conservan su alias en ambos esquemas.
+SCHEME = os.environ.get("ANONIMIZADOR_MODO", "secuencial").strip().lower()
+key_file = os.path.join(script_dir, ".clave_anonimizador")
+HASH_PREFIX = "PartH"
+HASH_LENGTH = 10
+_secret = None
+
+# Alias -> nombre, para detectar colisiones de alias derivados del hash
+_alias_owners = {}
+
+# Nombres que ya estan escritos en mapping_file (save_mapping solo agrega los nuevos)
+_saved_names = set()
+
+def _alias_number(alias):
+    """Numero N de un alias 'PartN' (None si no tiene ese formato)"""
+    suffix = alias.replace("Part", "", 1)
+    return int(suffix) if suffix.isdigit() else None
+
+def _mapping_signature():
+    """Tamano y fecha de modificacion del CSV del mapa (None si no existe)"""
+    try:
+        stat = os.stat(mapping_file)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _read_counter():
+    """Siguiente numero guardado en counter_file, si corresponde al CSV actual"""
+    import json
+    try:
+        with open(counter_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("csv") != _mapping_signature():
+        return None
+    number = data.get("siguiente")
+    return number if isinstance(number, int) and number >= 1 else None
+
+def _write_counter(next_number):
+    """Guarda el siguiente numero de alias para el CSV tal como quedo en disco (de forma atomica)"""
+    import json
+    tmp_path = f"{counter_file}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"siguiente": next_number, "csv": _mapping_signature()}, f)
+    os.replace(tmp_path, counter_file)
+
+def _read_mapping_file():
+    """Filas (nombre normalizado, alias) de mapping_file tal como esta en disco ([] si no existe)"""
+    if not os.path.exists(mapping_file):
+        return []
+    with open(mapping_file, "r", encoding="utf-8") as f:
+        return [(row["Nombre_Real"].strip().upper(), row["Alias"]) for row in csv.DictReader(f)]
 
 def _load_existing_mapping():
-    """Carga el mapa de participantes existente si ya hay un archivo"""
-    global ANONYMIZED_MAP, _counter
+    """Carga el mapa de participantes existente si ya hay un archivo (una sola vez por proceso)"""
+    global _counter, _loaded
+    if _loaded:
+        return
+    _loaded = True
     if os.path.exists(mapping_file):
-        with open(mapping_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                name = row["Nombre_Real"].strip().upper()
-                ANONYMIZED_MAP[name] = row["Alias"]
+        for name, file_alias in _read_mapping_file():
+            # Los nombres asignados antes de la carga (si los hubiera) conservan su alias
+            alias = ANONYMIZED_MAP.setdefault(name, file_alias)
+            _alias_owners[alias] = name
+            _saved_names.add(name)
 
-        # Ajustar el contador al último número usado
-        if ANONYMIZED_MAP:
-            max_num = max(int(alias.replace("Part", "")) for alias in ANONYMIZED_MAP.values())
-            _counter = max_num + 1
+        # Ajustar el contador al último número usado: se lee del archivo contador si
+        # coincide con el CSV; si no, se recorren los alias (los PartH<hex> no cuentan)
+        next_number = _read_counter()
+        if next_number is None:
+            numbers = [n for n in map(_alias_number, ANONYMIZED_MAP.values()) if n is not None]
+            next_number = max(numbers) + 1 if numbers else 1
+        _counter = max(_counter, next_number)
 
-# Cargar el mapa existente apenas se importa el modulo
-_load_existing_mapping()
+def use_sqlite_backend(path=None):
+    """Activa el backend SQLite (opcionalmente en otra ruta). Equivale a ANONIMIZADOR_BACKEND=sqlite."""
+    global BACKEND, db_file, _connection
+    BACKEND = "sqlite"
+    if path is not None and path != db_file:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+        db_file = path
 
-def anonymize_name(real_name):
-    """Devuelve un alias (Part_1, Part_2, ...) para un participante real (case-insensitive)"""
+def use_hmac_pseudonyms(secret=None):
+    """Activa los alias derivados de HMAC (equivale a ANONIMIZADOR_MODO=hmac), opcionalmente con otra clave"""
+    global SCHEME, _secret
+    SCHEME = "hmac"
+    if secret is not None:
+        _secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+
+def _get_secret():
+    """
+    Clave del HMAC: ANONIMIZADOR_SECRETO o el archivo .clave_anonimizador (se crea si no existe).
+    Todos los procesos y equipos que deban coincidir en los alias tienen que usar la misma clave.
+    """
+    global _secret
+    if _secret is None:
+        env_secret = os.environ.get("ANONIMIZADOR_SECRETO")
+        if env_secret:
+            _secret = env_secret.encode("utf-8")
+        else:
+            import secrets
+            try:
+                # O_EXCL: si dos procesos la crean a la vez, gana uno solo y el otro la lee
+                fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(secrets.token_hex(32))
+                print(f"Clave de anonimizacion creada en: {key_file}")
+            except FileExistsError:
+                pass
+            with open(key_file, "r", encoding="utf-8") as f:
+                _secret = f.read().strip().encode("utf-8")
+            if not _secret:
+                raise ValueError(f"El archivo de clave esta vacio: {key_file}")
+    return _secret
+
+def _hmac_alias(name):
+    """
+    Alias PartH<hex> del HMAC-SHA256 del nombre normalizado.
+    Si el prefijo ya pertenece a otro nombre se alarga hasta que deje de coincidir.
+    """
+    import hashlib
+    import hmac
+    digest = hmac.new(_get_secret(), name.encode("utf-8"), hashlib.sha256).hexdigest()
+    for length in range(HASH_LENGTH, len(digest) + 1):
+        alias = f"{HASH_PREFIX}{digest[:length]}"
+        owner = _alias_owners.get(alias)
+        if owner is None or owner == name:
+            if length > HASH_LENGTH:
+                print(f"Aviso: colision de alias {HASH_PREFIX}{digest[:HASH_LENGTH]}, se usa {alias}")
+            return alias
+    raise ValueError(f"No se pudo asignar un alias sin colision para el hash {digest}")
+
+def _get_connection():
+    """
+    Abre la base SQLite (una vez por proceso) y le agrega los alias del CSV que todavia no tiene,
+    incluidos los que se asignaron despues con el backend CSV.
+    """
+    global _connection
+    if _connection is None:
+        import sqlite3
+        _load_existing_mapping()
+        # isolation_level=None: las transacciones se manejan explicitamente con BEGIN IMMEDIATE
+        _connection = sqlite3.connect(db_file, timeout=60, isolation_level=None)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS mapa ("
+            " nombre TEXT PRIMARY KEY,"
+            " alias TEXT NOT NULL UNIQUE,"
+            " numero INTEGER UNIQUE)"
+        )
+        _connection.execute("BEGIN IMMEDIATE")
+        try:
+            if ANONYMIZED_MAP:
+                _connection.executemany(
+                    "INSERT OR IGNORE INTO mapa (nombre, alias, numero) VALUES (?, ?, ?)",
+                    [(name, alias, _alias_number(alias)) for name, alias in ANONYMIZED_MAP.items()]
+                )
+                # Un alias del CSV que la base ya le dio a otro nombre no se puede registrar
+                stored = dict(_connection.execute("SELECT nombre, alias FROM mapa"))
+                for name, alias in ANONYMIZED_MAP.items():
+                    if stored.get(name) != alias:
+                        print(f"Aviso: {alias} de {mapping_file} ya esta asignado a otro nombre en {db_file}")
+            _connection.execute("COMMIT")
+        except Exception:
+            _connection.execute("ROLLBACK")
+            raise
+    return _connection
+
+def _next_free_number(conn, numero):
+    """Siguiente numero despues de numero cuyo alias PartN no esta usado ni en la base ni en el mapa cargado"""
+    numero += 1
+    while (f"Part{numero}" in _alias_owners
+           or conn.execute("SELECT 1 FROM mapa WHERE alias = ?", (f"Part{numero}",)).fetchone() is not None):
+        numero += 1
+    return numero
+
+def _sqlite_aliases(names, aliases=None):
+    """
+    Busca o asigna los alias de varios nombres normalizados en una unica transaccion.
+    aliases: alias ya calculados (esquema hmac) para registrar los nombres nuevos.
+    """
+    conn = _get_connection()
+    result = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        numero = None
+        for i, name in enumerate(names):
+            row = conn.execute("SELECT alias FROM mapa WHERE nombre = ?", (name,)).fetchone()
+            if row is not None:
+                result.append(row[0])
+                continue
+            if aliases is None:
+                if numero is None:
+                    # El mayor numero de la base o del CSV cargado (_counter), por si el CSV
+                    # recibio alias del backend CSV que la base no conoce
+                    numero = max(conn.execute("SELECT COALESCE(MAX(numero), 0) FROM mapa").fetchone()[0],
+                                 _counter - 1)
+                numero = _next_free_number(conn, numero)
+                alias, alias_numero = f"Part{numero}", numero
+            else:
+                alias, alias_numero = aliases[i], None
+            conn.execute("INSERT INTO mapa (nombre, alias, numero) VALUES (?, ?, ?)", (name, alias, alias_numero))
+            result.append(alias)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return result
+
+def _normalize(real_name):
+    """Forma canonica de un nombre: sin espacios en los extremos y en mayusculas"""
+    return real_name.strip().upper()
+
+def _assign_aliases(names):
+    """Asigna alias a nombres normalizados que todavia no estan en el mapa, en el orden dado"""
     global _counter
-    name = real_name.strip().upper()
+    if SCHEME == "hmac":
+        aliases = []
+        for name in names:
+            aliases.append(_hmac_alias(name))
+            # Registrar de inmediato para detectar colisiones dentro del mismo lote
+            _alias_owners[aliases[-1]] = name
+        if BACKEND == "sqlite":
+            aliases = _sqlite_aliases(names, aliases)
+    elif BACKEND == "sqlite":
+        aliases = _sqlite_aliases(names)
+    else:
+        aliases = [f"Part{number}" for number in range(_counter, _counter + len(names))]
+        _counter += len(names)
+    for name, alias in zip(names, aliases):
+        ANONYMIZED_MAP[name] = alias
+        _alias_owners[alias] = name
+
+def anonymize_name(real_name):
+    """Devuelve un alias (Part1, Part2, ... o PartH<hex> en modo hmac) para un participante real (case-insensitive)"""
+    if not _loaded:
+        _load_existing_mapping()
+    name = _normalize(real_name)
     if name not in ANONYMIZED_MAP:
-        ANONYMIZED_MAP[name] = f"Part{_counter}"
-        _counter += 1
+        _assign_aliases([name])
     return ANONYMIZED_MAP[name]
 
+def anonymize_many(real_names):
+    """
+    Alias de una secuencia de nombres, en el mismo orden.
+    Normaliza cada nombre distinto una sola vez y asigna los alias nuevos en bloque
+    (en orden de primera aparicion, igual que llamando a anonymize_name fila por fila).
+    """
+    _load_existing_mapping()
+    real_names = list(real_names)
+    normalized = {real: _normalize(real) for real in dict.fromkeys(real_names)}
+    missing = [name for name in dict.fromkeys(normalized.values()) if name not in ANONYMIZED_MAP]
+    if missing:
+        _assign_aliases(missing)
+    aliases = {real: ANONYMIZED_MAP[name] for real, name in normalized.items()}
+    return [aliases[real] for real in real_names]
+
+def anonymize_series(real_names):
+    """
+    Version vectorizada para una columna de pandas: resuelve los valores unicos con
+    anonymize_many y los mapea sobre toda la columna. Los valores faltantes quedan como NaN.
+    Devuelve una Series con el mismo indice.
+    """
+    import pandas as pd
+    real_names = pd.Series(real_names)
+    uniques = real_names.dropna().unique()
+    mapping = dict(zip(uniques, anonymize_many(uniques)))
+    return real_names.map(mapping)
+
+def _append_rows(rows):
+    """Agrega filas al CSV del mapa (crea el archivo con encabezado si no existe)"""
+    new_file = not os.path.exists(mapping_file) or os.path.getsize(mapping_file) == 0
+    if not new_file:
+        # Asegurar que la ultima fila termine en salto de linea antes de agregar
+        with open(mapping_file, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) not in (b"\n", b"\r")
+    with open(mapping_file, "a", newline='', encoding="utf-8") as f:
+        if not new_file and needs_newline:
+            f.write("\n")
+        writer = csv.writer(f, lineterminator="\n")
+        if new_file:
+            writer.writerow(["Nombre_Real", "Alias"])
+        writer.writerows(rows)
+
+def _check_free_aliases(rows, on_disk):
+    """Rechaza escribir un alias que en mapping_file ya pertenece a otro nombre"""
+    owners = {alias: name for name, alias in on_disk}
+    for name, alias in rows:
+        owner = owners.setdefault(alias, name)
+        if owner != name:
+            raise ValueError(f"El alias {alias} de {name} ya esta asignado a {owner} en {mapping_file}")
+
 def save_mapping():
-    """Guarda o actualiza el mapa real->alias en un CSV"""
-    with open(mapping_file, "w", newline='', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Nombre_Real", "Alias"])
-        for real, alias in ANONYMIZED_MAP.items():
-            writer.writerow([real, alias])
+    """Guarda el mapa real->alias en el CSV, agregando solo las entradas nuevas"""
+    _load_existing_mapping()
+    if BACKEND == "sqlite":
+        # La base es la fuente de verdad; la transaccion serializa a los procesos que escriben el CSV
+        conn = _get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            on_disk = _read_mapping_file()
+            saved = {name for name, _ in on_disk}
+            rows = [(name, alias) for name, alias in
+                    conn.execute("SELECT nombre, alias FROM mapa ORDER BY numero, nombre")
+                    if name not in saved]
+            if rows:
+                _check_free_aliases(rows, on_disk)
+                _append_rows(rows)
+            next_number = conn.execute("SELECT COALESCE(MAX(numero), 0) + 1 FROM mapa").fetchone()[0]
+            _write_counter(next_number)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _saved_names.update(saved)
+        _saved_names.update(name for name, _ in rows)
+    else:
+        if not os.path.exists(mapping_file):
+            _saved_names.clear()
+        rows = [(real, alias) for real, alias in ANONYMIZED_MAP.items() if real not in _saved_names]
+        if rows:
+            _check_free_aliases(rows, _read_mapping_file())
+            _append_rows(rows)
+            _saved_names.update(real for real, _ in rows)
+        if os.path.exists(mapping_file):
+            _write_counter(_counter)
 
     print(f"Mapa de participantes actualizado en: {mapping_file}")
@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+import inspect
+
+MANIFEST_NAME = ".render_manifest.json"
+
+_source_hashes = {}
+
+def _module_source_hash(render_func):
+    """Hash del archivo que define la funcion de dibujo: cualquier cambio de estilo invalida sus graficos"""
+    path = inspect.getsourcefile(render_func)
+    if path not in _source_hashes:
+        with open(path, "rb") as f:
+            _source_hashes[path] = hashlib.sha256(f.read()).hexdigest()
+    return _source_hashes[path]
+
+def _json_default(obj):
+    """Serializa tipos de numpy/pandas de forma estable para el hash"""
+    if hasattr(obj, "to_json"):
+        return obj.to_json(orient="split", double_precision=15)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+def figure_hash(render_func, params):
+    """
+    Hash del contenido de un grafico: los datos y parametros que recibe la funcion de dibujo,
+    el codigo del modulo que lo dibuja y la version de matplotlib.
+    La funcion se identifica por su archivo y __qualname__, no por __module__ (que vale "__main__"
+    al ejecutar el script directamente), asi todos los puntos de entrada comparten el manifiesto.
+    """
+    import matplotlib
+    payload = json.dumps(
+        [os.path.basename(inspect.getsourcefile(render_func)), render_func.__qualname__,
+         _module_source_hash(render_func), matplotlib.__version__, params],
+        sort_keys=True, default=_json_default
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_manifest(output_dir):
+    """Carga el manifiesto {archivo: hash} de un directorio de graficos"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+def save_manifest(output_dir, manifest):
+    """Guarda el manifiesto de forma atomica"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def is_fresh(manifest, output_dir, filename, digest):
+    """True si el archivo existe y fue generado con exactamente los mismos datos y estilo"""
+    return manifest.get(filename) == digest and os.path.exists(os.path.join(output_dir, filename))
+
+def render_if_changed(manifest, output_dir, filename, render_func, *args, force=False):
+    """
+    Dibuja el grafico solo si cambio su hash respecto al manifiesto.
+    Devuelve True si se dibujo. El argumento output_dir no forma parte del hash.
+    """
+    params = [a for a in args if a is not output_dir]
+    digest = figure_hash(render_func, params)
+    if not force and is_fresh(manifest, output_dir, filename, digest):
+        return False
+    render_func(*args)
+    manifest[filename] = digest
+    return True
@@ -0,0 +1,165 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_RESAMPLES = 10000
+# Remuestreos por bloque: cada bloque tiene su propia semilla derivada, asi el resultado
+# es el mismo con cualquier cantidad de procesos
+BLOCK_SIZE = 1000
+
+def _as_matrix(values):
+    """Matriz (n x k) de float; un vector se toma como una sola columna"""
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+def _seed_sequence(seed):
+    """SeedSequence de una semilla (entero, lista de enteros o una SeedSequence ya derivada)"""
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+def independent_seeds(seed, n):
+    """
+    n semillas hijas independientes de una semilla. Usar una para cada procedimiento que
+    remuestrea los mismos datos (p. ej. bootstrap y test de permutacion), asi sus sorteos no
+    comparten la misma secuencia aleatoria.
+    """
+    return _seed_sequence(seed).spawn(n)
+
+def _blocks(seed, total, block_size=BLOCK_SIZE):
+    """Divide total remuestreos en bloques (tamano, SeedSequence) derivados de una semilla"""
+    sizes = [block_size] * (total // block_size)
+    if total % block_size:
+        sizes.append(total % block_size)
+    return list(zip(sizes, _seed_sequence(seed).spawn(len(sizes))))
+
+def _run_blocks(kernel, data, blocks, workers=1):
+    """Aplica kernel(data, tamano, semilla) a cada bloque (en un pool si workers > 1) y apila los resultados"""
+    jobs = [(data, size, seed) for size, seed in blocks]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            results = list(executor.map(_call_kernel, [(kernel, job) for job in jobs]))
+    else:
+        results = [kernel(*job) for job in jobs]
+    return np.concatenate(results, axis=0)
+
+def _call_kernel(task):
+    kernel, args = task
+    return kernel(*args)
+
+def bootstrap_weights(n, size, rng):
+    """
+    Cuantas veces aparece cada fila en cada remuestreo: matriz (size x n).
+    Los indices de todos los remuestreos del bloque se sortean en un unico arreglo.
+    """
+    indices = rng.integers(0, n, size=(size, n))
+    offsets = (np.arange(size) * n)[:, None]
+    return np.bincount((indices + offsets).ravel(), minlength=size * n).reshape(size, n)
+
+def _bootstrap_kernel(diffs, size, seed):
+    """Media y tamano de efecto d_z de cada columna en size remuestreos: arreglo (2, size, k)"""
+    n = len(diffs)
+    weights = bootstrap_weights(n, size, np.random.default_rng(seed)).astype(float)
+    means = weights @ diffs / n
+    second = weights @ (diffs * diffs) / n
+    variance = np.clip(second - means * means, 0, None) * n / (n - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effect = np.where(variance > 0, means / np.sqrt(variance), np.nan)
+    return np.stack([means, effect], axis=1)
+
+def effect_size(diffs):
+    """d_z de cada columna: media de las diferencias pareadas / su desviacion estandar (ddof=1)"""
+    diffs = _as_matrix(diffs)
+    std = diffs.std(axis=0, ddof=1) if len(diffs) > 1 else np.full(diffs.shape[1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, diffs.mean(axis=0) / std, np.nan)
+
+def paired_bootstrap(diffs, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1, confidence=0.95):
+    """
+    Bootstrap de diferencias pareadas (filas = participantes, columnas = puntajes) para todas
+    las columnas a la vez. Devuelve un dict de arreglos (uno por columna):
+    media, d_z, ic_inf/ic_sup (percentiles de la media) y d_z_ic_inf/d_z_ic_sup.
+    Las filas con valores faltantes deben quitarse antes.
+    """
+    diffs = _as_matrix(diffs)
+    k = diffs.shape[1]
+    alpha = (1 - confidence) / 2
+    result = {"media": diffs.mean(axis=0) if len(diffs) else np.full(k, np.nan),
+              "d_z": effect_size(diffs)}
+    if len(diffs) < 2:
+        for key in ("ic_inf", "ic_sup", "d_z_ic_inf", "d_z_ic_sup"):
+            result[key] = np.full(k, np.nan)
+        return result
+
+    resamples = _run_blocks(_bootstrap_kernel, diffs, _blocks(seed, n_resamples), workers)
+    means, effects = resamples[:, 0, :], resamples[:, 1, :]
+    result["ic_inf"], result["ic_sup"] = np.quantile(means, [alpha, 1 - alpha], axis=0)
+    with np.errstate(invalid="ignore"):
+        result["d_z_ic_inf"], result["d_z_ic_sup"] = np.nanquantile(effects, [alpha, 1 - alpha], axis=0)
+    return result
+
+def all_sign_flips(n):
+    """Las 2^n combinaciones de signos (+1/-1) de n diferencias: matriz (2^n x n)"""
+    codes = np.arange(2 ** n)[:, None] >> np.arange(n)[None, :]
+    return np.where(codes & 1, -1.0, 1.0)
+
+def random_signs(size, n, rng):
+    """Matriz (size x n) de signos +1/-1 equiprobables, sorteando 8 signos por byte aleatorio"""
+    bits = np.unpackbits(rng.integers(0, 256, size=(size, (n + 7) // 8), dtype=np.uint8), axis=1)
+    return 1.0 - 2.0 * bits[:, :n]
+
+def _sign_flip_kernel(values, size, seed):
+    """Suma de cada columna con signos al azar en size permutaciones: arreglo (size, k)"""
+    rng = np.random.default_rng(seed)
+    signs = np.where(rng.random((size, len(values))) < 0.5, -1.0, 1.0)
+    return signs @ values
+
+def _packed_sign_flip_kernel(values, size, seed):
+    """Como _sign_flip_kernel, pero con los signos de random_signs (8 por byte aleatorio)"""
+    return random_signs(size, len(values), np.random.default_rng(seed)) @ values
+
+def sign_flip_test(values, n_permutations=DEFAULT_RESAMPLES, seed=0, workers=1, packed_signs=False):
+    """
+    Test de permutacion pareado (dos colas) para todas las columnas a la vez: bajo la hipotesis nula
+    el signo de cada diferencia es intercambiable, y el estadistico es la suma de cada columna.
+    Con diferencias crudas equivale a testear la media; con rangos con signo es el test de Wilcoxon.
+    Si 2^n <= n_permutations se enumeran todas las combinaciones (p exacto); si no, Monte Carlo
+    con p = (1 + extremos) / (1 + permutaciones).
+    packed_signs: sortea los signos con random_signs (mas rapido con muchas filas). Con la misma
+    semilla da otros p-valores Monte Carlo que el sorteo por defecto.
+    Devuelve (p_valores, exacto).
+    """
+    values = _as_matrix(values)
+    n, k = values.shape
+    if n == 0:
+        return np.full(k, np.nan), True
+
+    observed = np.abs(values.sum(axis=0))
+    # Tolerancia para empates de punto flotante entre sumas iguales
+    tolerance = 1e-9 * np.maximum(np.abs(values).sum(axis=0), 1.0)
+
+    exact = 2 ** n <= n_permutations
+    if exact:
+        sums = all_sign_flips(n) @ values
+        return (np.abs(sums) >= observed - tolerance).mean(axis=0), True
+
+    kernel = _packed_sign_flip_kernel if packed_signs else _sign_flip_kernel
+    sums = _run_blocks(kernel, values, _blocks(seed, n_permutations), workers)
+    extreme = (np.abs(sums) >= observed - tolerance).sum(axis=0)
+    return (1 + extreme) / (1 + n_permutations), False
+
+def signed_ranks(diffs):
+    """
+    Rangos con signo de Wilcoxon por columna (rango promedio en empates, ceros descartados con rango 0).
+    La suma de la matriz resultante es W+ - W-.
+    """
+    diffs = _as_matrix(diffs)
+    absolute = np.where(diffs == 0, np.nan, np.abs(diffs))
+    ranks = np.empty_like(absolute)
+    for j in range(diffs.shape[1]):
+        column = absolute[:, j]
+        valid = ~np.isnan(column)
+        # Rango promedio de los empates: rango medio de cada valor distinto
+        unique, inverse, counts = np.unique(column[valid], return_inverse=True, return_counts=True)
+        ends = np.cumsum(counts)
+        average = ends - (counts - 1) / 2
+        ranks[valid, j] = average[inverse]
+        ranks[~valid, j] = 0.0
+    return np.sign(diffs) * ranks